@@ -1,102 +1,195 @@
 import matplotlib.pyplot as plt
+import pandas as pd
+
 plt.rcParams['font.family'] = 'Times New Roman'
 
+# Read the algorithm list: one row per paper (ID as numbered in the figure) and
+# year, with the algorithms it uses in ALGORITHM_COLUMN, one per row or
+# separated by commas or semicolons (e.g. "NB, SVM, RF")
+file_path = './bubble_algorithms.csv'  # Replace with your CSV file path
+pdf_file_path = 'fig/bubble.pdf'
+ID_COLUMN = 'ID'
+YEAR_COLUMN = 'Publication Year'
+ALGORITHM_COLUMN = 'Algorithm'
+IDS_PER_LINE = 2  # paper ids per line in a bubble label
+
 # Algorithm names, with a y-axis placeholder
 algorithms_left  = ['DT', 'LR', 'MaxEnt', 'MNB', 'NB', 'RF', 'SVM']
 algorithms_right = ['MLP', 'CNN', 'LSTM', 'TextRNN', 'BiLSTM', 'FastText', 'BERT']
 algorithms = algorithms_left + [''] + algorithms_right  # '' is a y-axis placeholder
 
-num_yaxis = len(algorithms_left)  # Index used for the y-axis column
+# Spelled-out names that may appear in the paper list (matched case-insensitively)
+ALGORITHM_ALIASES = {
+    'decision tree': 'DT',
+    'logistic regression': 'LR',
+    'maximum entropy': 'MaxEnt',
+    'multinomial naive bayes': 'MNB',
+    'naive bayes': 'NB',
+    'random forest': 'RF',
+    'support vector machine': 'SVM',
+    'multilayer perceptron': 'MLP',
+}
 
-# Years and their row positions (descending so it matches matplotlib's bottom-to-top plotting)
-years = [2015,2016,2017,2018,2019,2020,2021,2022,2024,""]
-year_pos = list(range(len(years)))  # 0,1,2,3,4,5,6
-
-# Example bubble data
-# (x position, y position, count, 'label', highlight?)
-datas = [
-    # DT (x=0)
-    (0, 6.5, 2, '3,84', False),
-    (0, 5.5, 2, '184\n155', False),
-    (0, 4.5, 1, '157', False),
-    (0, 3.5, 1, '167', False),
-    (0, 2.5, 1, '46', False),
-    (0, 1.5, 7, '170,113,\n109,135,\n133,45,\n156', False),
-    (0, 0.5, 3, '64,134\n156', False),
-
-    # LR (x=1)
-    (1, 5.5, 3, '93,184\n155', False),
-    (1, 4.5, 3, '5,92\n37', False),
-    (1, 2.5, 1, '46', False),
-    (1, 1.5, 2, '113', False),
-    (1, 0.5, 1, '134\n156', False),  # From '16,39\\n48': '16' was removed (not mapped to new IDs)
-
-    # MaxEnt (x=2)
-    (2, 3.5, 1, '167', False),
-    (2, 1.5, 1, '170', False),
-    (2, 0.5, 1, '64', False),
-
-    # MNB (x=3)
-    (3, 5.5, 1, '93', False),
-    (3, 4.5, 1, '92', False),
-    (3, 1.5, 1, '113', False),
-
-    # NB (x=4)
-    (4, 6.5, 1, '3', False),
-    (4, 5.5, 3, '184,180\n155,93', False),
-    (4, 4.5, 4, '157,165\n37,166', False),
-    (4, 3.5, 2, '121\n167', False),
-    (4, 2.5, 3, '78,112\n46', False),
-    (4, 1.5, 5, '170,109\n135,113', False),
-    (4, 0.5, 4, '64,134\n150', False),
-
-    # RF (x=5)
-    (5, 8.5, 1, '1', False),
-    (5, 6.5, 1, '3', False),
-    (5, 5.5, 4, '93,184\n180,155', False),
-    (5, 4.5, 2, '157\n92', False),
-    (5, 1.5, 2, '109\n113', False),
-    (5, 0.5, 1, '156', False),
-
-    # SVM (x=6)
-    (6, 6.5, 1, '77', False),
-    (6, 5.5, 5, '93,184\n180,3\n119', False), #2021
-    (6, 4.5, 4, '157,5\n37,92', False),
-    (6, 3.5, 1, '121', False),
-    (6, 2.5, 3, '78,112\n46', False),
-    (6, 0.5, 1, '134', False),  # From '16,39': '16' was removed
-
-
-    # MLP (x=7)
-    (8, 5.5, 1, '93', False),
-    (8, 4.5, 1, '92', False),
-
-    # CNN (x=8)
-    (9, 5.5, 3, '93,6\n74', False),
-    (9, 4.5, 2, '157\n92', False),
-
-    # LSTM (x=9)
-    (10, 5.5, 1, '93', False),
-    (10, 4.5, 1, '92', False),
-
-    # TextRNN (x=10)
-    (11, 5.5, 1, '93', False),
-    (11, 4.5, 1, '92', False),
-
-    # BiLSTM (x=11)
-    (12, 5.5, 2, '153\n103', False),
-
-    # FastText (x=12)
-    (13, 6.5, 1, '84', False),
-    (13, 4.5, 2, '157\n83', False),
-
-    # BERT (x=13)
-    (14, 7.5, 1, '77', False),  # ID 30 has no match and was removed, so it can be omitted
-
-    # You can add more bubbles as needed
-]
+num_yaxis = len(algorithms_left)  # Index used for the y-axis column
 
 
+def bubble_label(ids):
+    """Paper ids of one bubble, at most IDS_PER_LINE per line and on at least
+    two lines, so that they fit in small bubbles."""
+    ids = [str(i) for i in ids]
+    per_line = max(1, min(IDS_PER_LINE, (len(ids) + 1) // 2))
+    return '\n'.join(','.join(ids[i:i + per_line]) for i in range(0, len(ids), per_line))
+
+
+def build_bubbles(df):
+    """Years (bottom to top, '' on top) and (x, y, count, 'label', highlight?)
+    bubbles for the papers in df, one per algorithm x year cell."""
+    for column in (ID_COLUMN, YEAR_COLUMN, ALGORITHM_COLUMN):
+        if column not in df.columns:
+            raise ValueError(f"Column '{column}' was not found in {file_path}")
+    if 'Final' in df.columns:
+        df = df[df['Final'] == 'Included']
+
+    # One row per (paper, algorithm)
+    papers = pd.DataFrame({
+        'ID': df[ID_COLUMN],
+        'Year': pd.to_numeric(df[YEAR_COLUMN], errors='coerce'),
+        'Algorithm': df[ALGORITHM_COLUMN].astype('string').str.split(r'[,;]'),
+    }).dropna(subset=['Year', 'Algorithm']).explode('Algorithm', ignore_index=True)
+    papers['Year'] = papers['Year'].astype(int)
+    names = papers['Algorithm'].str.strip()
+    canonical = {name.lower(): name for name in algorithms if name}
+    canonical.update(ALGORITHM_ALIASES)
+    papers['Algorithm'] = names.str.lower().map(canonical)
+    unknown = names[papers['Algorithm'].isna() & (names != '')].unique()
+    if len(unknown):
+        print(f"Not in the figure: {', '.join(sorted(unknown))}")
+    papers = papers.dropna(subset=['Algorithm']).drop_duplicates()
+
+    # Years with at least one bubble, plus an empty row for the arrow head
+    counts = pd.crosstab(papers['Algorithm'], papers['Year'])
+    years = counts.columns.tolist() + [""]
+    ids = papers.groupby(['Algorithm', 'Year'], sort=False)['ID'].agg(list)
+    x_of = {name: xi for xi, name in enumerate(algorithms) if name}
+    y_of = {year: yi + 0.5 for yi, year in enumerate(years)}
+
+    cells = counts.stack()
+    cells = cells[cells > 0]
+    datas = [
+        (x_of[name], y_of[year], int(count), bubble_label(ids[name, year]), False)
+        for (name, year), count in cells.items()
+    ]
+    return years, datas
+
+
+def load():
+    """The algorithm list."""
+    return pd.read_csv(file_path)
+
+
+def plot(df):
+    # Years and their row positions (ascending, since matplotlib plots bottom to top),
+    # and the bubbles (x position, y position, count, 'label', highlight?)
+    years, datas = build_bubbles(df)
+    year_pos = list(range(len(years)))
+
+    fig, ax = plt.subplots(figsize=(16, 8))
+
+    # ★ Shift all vertical grid lines right by 0.5
+    for xi in range(len(algorithms)):
+        if xi == num_yaxis:
+            ax.axvline(xi, color='black', linewidth=1.2, zorder=1)    # Thicker y-axis
+        else:
+            ax.axvline(xi, color='black', linewidth=1.2, linestyle='--', zorder=1)
+    # Horizontal grid lines remain at y - 0.5
+    for yi in range(len(years)):
+        ax.axhline(yi - 0.5, color='black', linewidth=1.2, linestyle='--', zorder=1)
+
+        # 1) Compute column totals
+        col_total_counts = {}
+        for x, y, count, label, highlight in datas:
+            col_total_counts[x] = col_total_counts.get(x, 0) + count
+
+        # 2) Add total paper count at the top of each column
+        for xi, name in enumerate(algorithms):
+            # Skip y-axis placeholder column
+            if xi == num_yaxis:
+                continue
+            # Total (write 0 only if needed; omit if there are no bubbles)
+            total = col_total_counts.get(xi, 0)
+            # Top y position: max year row + ~0.8 to 1.0 (tweak if needed)
+            ax.text(xi, len(years) - 0.5, str(total),
+                    ha='center', va='bottom', fontsize=10, color='black', zorder=10,)
+
+    # Bubble plot
+    for x, y, count, label, highlight in datas:
+        # count=len(label.split(','))+1
+        size = count * 470
+        # if highlight:
+        #     circle = plt.Circle((x, y), radius=(size/800)**0.5, edgecolor='cornflowerblue',
+        #                         facecolor='aliceblue', lw=1, zorder=2)
+        #     ax.add_patch(circle)
+        #     plt.text(x, y, label, ha='center', va='center', fontsize=8, color='royalblue', weight='bold', zorder=3)
+        # else:
+        plt.scatter(x, y, s=size, edgecolor='black', facecolor='white', zorder=2)
+        plt.text(x, y, label, ha='center', va='center', fontsize=9, color='black', zorder=3)
+
+    # X-axis labels (make the y-axis column blank)
+    xticks = list(range(len(algorithms)))
+    xticklabels = algorithms.copy()
+    xticklabels[num_yaxis] = ""  # Hide algorithm label on the y-axis column
+    ax.set_xticks(xticks)
+    ax.set_xticklabels(xticklabels, fontsize=13)
+
+
+    # # Put years on the y-axis (num_yaxis), shift up by 0.5, not bold
+    # for i, y in enumerate(year_pos):
+    #     ax.text(num_yaxis, y-0.5, years[i], ha='center', va='center', fontsize=16, zorder=5)
+
+
+    # # ★ Put years on the y-axis (num_yaxis), shift up by 0.5, not bold, with a white background
+    for i, y in enumerate(year_pos):
+        ax.text(num_yaxis, y+0.5, years[i], ha='center', va='center', fontsize=13,
+                zorder=5, bbox=dict(facecolor='white', edgecolor='none', boxstyle='round,pad=0.1'))
+
+    # # Write year labels on the y-axis column
+    # for i, y in enumerate(year_pos):
+    #     ax.text(num_yaxis, y, years[::-1][i], ha='center', va='center', fontsize=16, fontweight="bold", zorder=5)
+    # Upward arrow
+    arrow_x = num_yaxis
+    ax.annotate(
+        '',
+        xy=(arrow_x, len(years)-0.3), xycoords='data',
+        xytext=(arrow_x, -0.5), textcoords='data',
+        arrowprops=dict(arrowstyle="->", color="black", lw=1),
+        annotation_clip=False
+    )
+    # x-axis
+    # Add a solid x-axis line at the bottom
+    ax.hlines(
+        y=-0.5,                             # Bottom of y-axis; note years are in descending order
+        xmin=-0.5, xmax=len(algorithms)-0.5,
+        color='black', linewidth=2.2, zorder=10
+    )
+    # Overall settings
+    ax.set_xlim(-0.5, len(algorithms)-0.5)
+    ax.set_ylim(-0.5, len(years)-0.5)
+    ax.set_yticks([])
+    ax.set_xlabel('')
+    ax.set_ylabel('')
+
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['bottom'].set_visible(False)
+    ax.spines['left'].set_visible(False)
+
+    plt.tight_layout()
+    fig.savefig(pdf_file_path, format='pdf', dpi=800, bbox_inches='tight')
+
+
+if __name__ == '__main__':
+    plot(load())
+    plt.show()
 
 # Paper index/title → ML method mapping (notes)
 # 91 khan2024miningMining: (MNB, LR, RF); deep learning (CNN, LSTM, BiLSTM)
@@ -104,97 +197,3 @@ datas = [
 # 3 izadi2022predicting: Feature engineering methods such as TF-IDF, with sentiment analysis assistance
 # 74 al2021classification: Associative classification algorithms (CMAR, CBA)
 # 116 nafees2021machine: SVM classifier
-
-fig, ax = plt.subplots(figsize=(16, 8))
-
-# ★ Shift all vertical grid lines right by 0.5
-for xi in range(len(algorithms)):
-    if xi == num_yaxis:
-        ax.axvline(xi, color='black', linewidth=1.2, zorder=1)    # Thicker y-axis
-    else:
-        ax.axvline(xi, color='black', linewidth=1.2, linestyle='--', zorder=1)
-# Horizontal grid lines remain at y - 0.5
-for yi in range(len(years)):
-    ax.axhline(yi - 0.5, color='black', linewidth=1.2, linestyle='--', zorder=1)
-
-    # 1) Compute column totals
-    col_total_counts = {}
-    for x, y, count, label, highlight in datas:
-        col_total_counts[x] = col_total_counts.get(x, 0) + count
-
-    # 2) Add total paper count at the top of each column
-    for xi, name in enumerate(algorithms):
-        # Skip y-axis placeholder column
-        if xi == num_yaxis:
-            continue
-        # Total (write 0 only if needed; omit if there are no bubbles)
-        total = col_total_counts.get(xi, 0)
-        # Top y position: max year row + ~0.8 to 1.0 (tweak if needed)
-        ax.text(xi, len(years) - 0.5, str(total),
-                ha='center', va='bottom', fontsize=10, color='black', zorder=10,)
-
-# Bubble plot
-for x, y, count, label, highlight in datas:
-    # count=len(label.split(','))+1
-    size = count * 470
-    # if highlight:
-    #     circle = plt.Circle((x, y), radius=(size/800)**0.5, edgecolor='cornflowerblue',
-    #                         facecolor='aliceblue', lw=1, zorder=2)
-    #     ax.add_patch(circle)
-    #     plt.text(x, y, label, ha='center', va='center', fontsize=8, color='royalblue', weight='bold', zorder=3)
-    # else:
-    plt.scatter(x, y, s=size, edgecolor='black', facecolor='white', zorder=2)
-    plt.text(x, y, label, ha='center', va='center', fontsize=9, color='black', zorder=3)
-
-# X-axis labels (make the y-axis column blank)
-xticks = list(range(len(algorithms)))
-xticklabels = algorithms.copy()
-xticklabels[num_yaxis] = ""  # Hide algorithm label on the y-axis column
-ax.set_xticks(xticks)
-ax.set_xticklabels(xticklabels, fontsize=13)
-
-
-# # Put years on the y-axis (num_yaxis), shift up by 0.5, not bold
-# for i, y in enumerate(year_pos):
-#     ax.text(num_yaxis, y-0.5, years[i], ha='center', va='center', fontsize=16, zorder=5)
-
-
-# # ★ Put years on the y-axis (num_yaxis), shift up by 0.5, not bold, with a white background
-for i, y in enumerate(year_pos):
-    ax.text(num_yaxis, y+0.5, years[i], ha='center', va='center', fontsize=13,
-            zorder=5, bbox=dict(facecolor='white', edgecolor='none', boxstyle='round,pad=0.1'))
-
-# # Write year labels on the y-axis column
-# for i, y in enumerate(year_pos):
-#     ax.text(num_yaxis, y, years[::-1][i], ha='center', va='center', fontsize=16, fontweight="bold", zorder=5)
-# Upward arrow
-arrow_x = num_yaxis
-ax.annotate(
-    '',
-    xy=(arrow_x, len(years)-0.3), xycoords='data',
-    xytext=(arrow_x, -0.5), textcoords='data',
-    arrowprops=dict(arrowstyle="->", color="black", lw=1),
-    annotation_clip=False
-)
-# x-axis
-# Add a solid x-axis line at the bottom
-ax.hlines(
-    y=-0.5,                             # Bottom of y-axis; note years are in descending order
-    xmin=-0.5, xmax=len(algorithms)-0.5,
-    color='black', linewidth=2.2, zorder=10
-)
-# Overall settings
-ax.set_xlim(-0.5, len(algorithms)-0.5)
-ax.set_ylim(-0.5, len(years)-0.5)
-ax.set_yticks([])
-ax.set_xlabel('')
-ax.set_ylabel('')
-
-ax.spines['top'].set_visible(False)
-ax.spines['right'].set_visible(False)
-ax.spines['bottom'].set_visible(False)
-ax.spines['left'].set_visible(False)
-
-plt.tight_layout()
-plt.show()
-fig.savefig('fig/bubble.pdf', format='pdf', dpi=800, bbox_inches='tight')
@@ -0,0 +1,141 @@
+"""
+Draw the figures headless and in parallel, redrawing only what changed
+(run from Figures/).
+
+Like make, a figure is redrawn only if its PDF is missing or older than
+one of the files it was drawn from: its script, workbook.py and its
+workbook. Those dependencies are recorded in DEPS_FILE after every build,
+so a build with nothing to do reads no workbook and imports neither pandas
+nor matplotlib. The figures that are out of date are drawn with the Agg
+backend by a process pool, so a full build takes about as long as the
+slowest figure. Each workbook is parsed once, by the parent before the
+pool starts, and then read from its Parquet copy (see workbook.py).
+
+Usage: python make_figures.py [-B] [-j N] [year venue topic source bubble]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+FIGURES = {
+    'year': 'year',
+    'venue': 'venue',
+    'topic': 'topic',
+    'source': 'source',
+    'bubble': 'bubbleFig',
+}
+DEPS_FILE = 'fig/.deps.json'  # per figure: its PDF and the files it was drawn from
+
+
+def render(name):
+    """Draw one figure headless; returns its dependency record."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import workbook
+
+    module = importlib.import_module(FIGURES[name])
+    start = time.perf_counter()
+    try:
+        module.plot(module.load())
+    finally:
+        plt.close('all')
+    return {
+        'target': os.path.abspath(module.pdf_file_path),
+        'deps': [os.path.abspath(p) for p in (module.__file__, workbook.__file__, module.file_path)],
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def warm_workbooks(names):
+    """Parse the workbooks of the figures `names` once in this process, so
+    the pool does not parse a shared workbook in several workers."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import workbook
+
+    paths = {os.path.abspath(importlib.import_module(FIGURES[name]).file_path) for name in names}
+    for path in sorted(paths):
+        if not path.endswith(('.xlsx', '.xls')):
+            continue
+        try:
+            workbook.warm(path)
+        except Exception as e:  # a figure using it reports the error when drawn
+            print(f"{os.path.relpath(path)}: not preloaded: {type(e).__name__}: {e}")
+
+
+def is_stale(record):
+    """True if the figure has no PDF or one of its dependencies is newer."""
+    if record is None:
+        return True
+    try:
+        built = os.stat(record['target']).st_mtime_ns
+        return any(os.stat(dep).st_mtime_ns > built for dep in record['deps'])
+    except FileNotFoundError:
+        return True
+
+
+def load_deps():
+    if not os.path.exists(DEPS_FILE):
+        return {}
+    with open(DEPS_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_deps(deps):
+    os.makedirs(os.path.dirname(DEPS_FILE), exist_ok=True)
+    with open(DEPS_FILE + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(deps, f, indent=1)
+    os.replace(DEPS_FILE + '.tmp', DEPS_FILE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('figures', nargs='*', metavar='figure',
+                        help=f"figures to draw: {', '.join(FIGURES)} (default: all)")
+    parser.add_argument('-B', '--always-make', action='store_true',
+                        help='redraw the figures even if they are up to date')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='figures drawn in parallel (default: number of CPUs)')
+    args = parser.parse_args()
+    unknown = [name for name in args.figures if name not in FIGURES]
+    if unknown:
+        parser.error(f"unknown figure: {', '.join(unknown)}")
+
+    deps = load_deps()
+    names = args.figures or list(FIGURES)
+    stale = [name for name in names if args.always_make or is_stale(deps.get(name))]
+    for name in names:
+        if name not in stale:
+            print(f"{name}: up to date")
+    if not stale:
+        return 0
+
+    os.makedirs(os.path.dirname(DEPS_FILE), exist_ok=True)
+    warm_workbooks(stale)
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(stale)))) as pool:
+            futures = {name: pool.submit(render, name) for name in stale}
+            for name, future in futures.items():
+                try:
+                    record = future.result()
+                except Exception as e:  # whatever a figure script raises
+                    print(f"{name}: failed: {type(e).__name__}: {e}")
+                    deps.pop(name, None)
+                    failed += 1
+                    continue
+                deps[name] = record
+                print(f"{name}: {record['seconds']:.2f}s -> {os.path.relpath(record['target'])}")
+    finally:
+        # keep the figures drawn so far up to date, even if the build is interrupted
+        save_deps(deps)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -2,59 +2,70 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from workbook import read_sheet
+
+# Set font
+plt.rcParams['font.family'] = 'Times New Roman'
+
 # Read the Excel file
 file_path = './source.xlsx'
-df = pd.read_excel(file_path)
+pdf_file_path = 'fig/source.pdf'
 
-# Extract data
-types = df['Types']
-counts = df['count']
 
-# Choose colors
-colors = plt.get_cmap('tab20').colors  # Use a distinct colormap
+def load():
+    """The first worksheet (see workbook.py)."""
+    return read_sheet(file_path)
 
 
-# Set font
-plt.rcParams['font.family'] = 'Times New Roman'
+def plot(df):
+    # Extract data
+    types = df['Types']
+    counts = df['count']
 
-# Create the pie chart
-fig, ax = plt.subplots(figsize=(8, 8))
-# Draw the pie chart
-wedges, _ = ax.pie(counts,
-                   labels=[''] * len(types),
-                   startangle=90,
-                   counterclock=False,
-                   colors=colors,
-                   wedgeprops=dict(width=0.6))  # Donut width
-
-# Add count labels
-for i, wedge in enumerate(wedges):
-    # Mid-angle of the wedge (degrees)
-    angle = (wedge.theta2 + wedge.theta1) / 2
-    # Convert degrees to radians
-    x = 0.7 * np.cos(np.deg2rad(angle))
-    y = 0.7 * np.sin(np.deg2rad(angle))
-    ax.text(x, y, str(counts[i]), ha='center', va='center', fontsize=16)
+    # Choose colors
+    colors = plt.get_cmap('tab20').colors  # Use a distinct colormap
 
-# patches, texts, autotexts = plt.pie(
-#     counts,
-#     labels=[''] * len(types),  # Hide labels
-#     colors=colors[:len(types)],
-#     autopct=lambda pct: '{:.0f}'.format(pct * sum(counts) / 100),  # Show counts
-#     textprops={'fontname': 'Times New Roman', 'fontsize': 14}
-# )
+    # Create the pie chart
+    fig, ax = plt.subplots(figsize=(8, 8))
+    # Draw the pie chart
+    wedges, _ = ax.pie(counts,
+                       labels=[''] * len(types),
+                       startangle=90,
+                       counterclock=False,
+                       colors=colors,
+                       wedgeprops=dict(width=0.6))  # Donut width
 
-# Add legend
-ax.legend(wedges, types, loc="center left", bbox_to_anchor=(1, 0.5),
-          fontsize=14, prop={'family': 'Times New Roman', 'size': 14})
+    # Add count labels
+    for i, wedge in enumerate(wedges):
+        # Mid-angle of the wedge (degrees)
+        angle = (wedge.theta2 + wedge.theta1) / 2
+        # Convert degrees to radians
+        x = 0.7 * np.cos(np.deg2rad(angle))
+        y = 0.7 * np.sin(np.deg2rad(angle))
+        ax.text(x, y, str(counts[i]), ha='center', va='center', fontsize=16)
 
+    # patches, texts, autotexts = plt.pie(
+    #     counts,
+    #     labels=[''] * len(types),  # Hide labels
+    #     colors=colors[:len(types)],
+    #     autopct=lambda pct: '{:.0f}'.format(pct * sum(counts) / 100),  # Show counts
+    #     textprops={'fontname': 'Times New Roman', 'fontsize': 14}
+    # )
 
-# plt.title('Distribution of Types', fontname='Times New Roman', fontsize='16')
-plt.tight_layout()
+    # Add legend
+    ax.legend(wedges, types, loc="center left", bbox_to_anchor=(1, 0.5),
+              fontsize=14, prop={'family': 'Times New Roman', 'size': 14})
+
+
+    # plt.title('Distribution of Types', fontname='Times New Roman', fontsize='16')
+    plt.tight_layout()
+
+    plt.savefig(pdf_file_path, format='pdf', dpi=600)
 
-plt.savefig('fig/source.pdf', format='pdf', dpi=600)
 
-plt.show()
+if __name__ == '__main__':
+    plot(load())
+    plt.show()
 
 
 # import pandas as pd
@@ -0,0 +1,123 @@
+"""
+Load the figure workbooks once and keep a Parquet copy of every sheet.
+
+The first read of a workbook parses all of its sheets and writes each one
+to CACHE_DIR as Parquet, next to a JSON file with the workbook's mtime,
+size and SHA-1. Later reads use the Parquet copies as long as the mtime
+and size are unchanged, or, if only the mtime changed, the hash is the
+same; otherwise the workbook is parsed again. Within one process every
+sheet is loaded once, so all figures drawn from it share the same frame.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+CACHE_DIR = '.cache'
+
+_workbooks = {}  # absolute path -> {sheet name: DataFrame}
+_rechecked = {}  # (absolute path, sheet) -> rows with recheck == 1
+
+
+def _sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_name(path):
+    """Cache file prefix of a workbook, unique per absolute path."""
+    tag = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    return os.path.join(CACHE_DIR, f"{os.path.basename(path)}-{tag}")
+
+
+def _replace(write, path):
+    tmp = f"{path}.{os.getpid()}.tmp"  # figures may be drawn by parallel processes
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_json(data, path):
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    _replace(write, path)
+
+
+def _load_cached(path, stat):
+    """{sheet: frame} from the Parquet copies, or None if they are stale."""
+    meta_path = _cache_name(path) + '.json'
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if (meta['mtime_ns'], meta['size']) != (stat.st_mtime_ns, stat.st_size):
+        if meta['size'] != stat.st_size or meta['sha1'] != _sha1(path):
+            return None
+        meta['mtime_ns'] = stat.st_mtime_ns  # touched, not changed
+        _write_json(meta, meta_path)
+    try:
+        return {sheet: pd.read_parquet(os.path.join(CACHE_DIR, name)) for sheet, name in meta['sheets']}
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(path, stat, sheets):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    prefix = _cache_name(path)
+    entries = []
+    try:
+        for i, (sheet, frame) in enumerate(sheets.items()):
+            name = f"{os.path.basename(prefix)}.{i}.parquet"
+            _replace(lambda tmp: frame.to_parquet(tmp, index=False), os.path.join(CACHE_DIR, name))
+            entries.append([sheet, name])
+    except (ValueError, TypeError, ImportError) as e:  # e.g. a column mixing text and numbers
+        print(f"Not caching {path}: {e}")
+        return
+    meta = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': _sha1(path), 'sheets': entries}
+    _write_json(meta, prefix + '.json')
+
+
+def _load(path):
+    stat = os.stat(path)
+    sheets = _load_cached(path, stat)
+    if sheets is None:
+        sheets = pd.read_excel(path, sheet_name=None)
+        _write_cache(path, stat, sheets)
+    return sheets
+
+
+def read_sheet(path, sheet_name=0):
+    """One sheet (name or position) of the workbook at `path`; do not modify it."""
+    warm(path)
+    sheets = _workbooks[os.path.abspath(path)]
+    if isinstance(sheet_name, int):
+        return list(sheets.values())[sheet_name]
+    if sheet_name not in sheets:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    return sheets[sheet_name]
+
+
+def warm(path):
+    """Load the workbook at `path` now, parsing it into CACHE_DIR if its
+    Parquet copy is missing or stale."""
+    key = os.path.abspath(path)
+    if key not in _workbooks:
+        _workbooks[key] = _load(path)
+
+
+def rechecked(path, sheet_name=0):
+    """Rows of a sheet with recheck == 1, shared by every caller; do not modify it."""
+    key = (os.path.abspath(path), sheet_name)
+    if key not in _rechecked:
+        df = read_sheet(path, sheet_name)
+        # Ensure the "recheck" column exists
+        if 'recheck' not in df.columns:
+            raise ValueError("Column 'recheck' was not found in the Excel file")
+        _rechecked[key] = df[df['recheck'] == 1]
+    return _rechecked[key]
@@ -0,0 +1,146 @@
+"""
+Memory benchmark: str-based snowball working set vs the interned one.
+
+Simulates one snowballing round over a synthetic citation graph and
+measures (with tracemalloc) what the working set costs when kept as the
+original str sets/dicts/lists versus idstore's IdTable + SourceLists as
+filled by the crawl itself (snowballing._add_neighbors), with each
+membership index from idindex.py. For the disk-backed indexes
+only the Python heap is counted (SQLite's page cache is a few MiB).
+
+Usage: python bench_memory.py [--papers 1000000] [--seeds 5000]
+"""
+
+import argparse
+import gc
+import hashlib
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+from idindex import index_spec, make_index
+from idstore import BACKWARD, FORWARD, PROCESSED, IdTable, SourceLists
+
+
+def synthetic_neighbors(n_papers, n_seeds, seed=0):
+    """Yield (seed id, backward ids, forward ids) so ~n_papers distinct ids appear."""
+    rng = random.Random(seed)
+    per_seed = max(1, n_papers // n_seeds)
+    for s in range(n_seeds):
+        seed_pid = hashlib.sha1(f"seed-{s}".encode()).hexdigest()
+        picks = [
+            hashlib.sha1(str(rng.randrange(n_papers)).encode()).hexdigest()
+            for _ in range(int(per_seed * 1.3))
+        ]
+        half = len(picks) // 2
+        yield seed_pid, picks[:half], picks[half:]
+
+
+def build_str_structures(graph, seed_ids):
+    processed_ids = set(seed_ids)
+    round_new_ids = set()
+    all_backward = set()
+    all_forward = set()
+    paper_sources = {}
+    buffer_new_ids = []
+    for pid, backward, forward in graph:
+        for direction, target, neighbors in (
+            ("backward", all_backward, backward),
+            ("forward", all_forward, forward),
+        ):
+            for n_pid in neighbors:
+                if n_pid in processed_ids or n_pid in round_new_ids:
+                    continue
+                paper_sources.setdefault(n_pid, []).append((pid, direction))
+                round_new_ids.add(n_pid)
+                target.add(n_pid)
+                buffer_new_ids.append(n_pid)
+    return (processed_ids, round_new_ids, all_backward, all_forward, paper_sources, buffer_new_ids)
+
+
+def build_compact_structures(graph, seed_ids, add_neighbors, index=None):
+    """The crawl's own structures, filled by snowballing._add_neighbors."""
+    ids = IdTable(index)
+    sources = SourceLists()
+    for pid in seed_ids:
+        ids.flags[ids.intern(pid)] |= PROCESSED
+    round_new_ids = array("l")
+    buffer_new_ids = array("l")
+    for pid, backward, forward in graph:
+        src = ids.get(pid)
+        add_neighbors(ids, sources, src, backward, BACKWARD, buffer_new_ids, round_new_ids)
+        add_neighbors(ids, sources, src, forward, FORWARD, buffer_new_ids, round_new_ids)
+    return ids, sources, round_new_ids, buffer_new_ids
+
+
+def measure(builder, args, seed_ids):
+    # The graph is generated inside the traced section, like API responses:
+    # only the id strings a structure keeps alive count towards its size.
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = builder(synthetic_neighbors(args.papers, args.seeds), seed_ids)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if isinstance(result, tuple) and isinstance(result[0], IdTable):
+        result[0].close()
+    del result
+    return current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--papers", type=int, default=200_000, help="distinct ids to discover")
+    parser.add_argument("--seeds", type=int, default=2_000, help="number of seed papers")
+    args = parser.parse_args()
+
+    seed_ids = [pid for pid, _, _ in synthetic_neighbors(args.papers, args.seeds)]
+    seed_set = set(seed_ids)
+    discovered = len(
+        {p for _, b, f in synthetic_neighbors(args.papers, args.seeds) for p in b + f}
+        - seed_set
+    )
+    print(f"Seeds: {len(seed_ids)}, discovered ids: {discovered}")
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "ids.sqlite")
+        # snowballing opens its response cache in the working directory
+        os.chdir(tmp)
+        import snowballing as sb
+
+        def interned(kind):
+            def build(graph, seeds):
+                index = make_index(index_spec(kind, index_path))
+                return build_compact_structures(graph, seeds, sb._add_neighbors, index)
+
+            return build
+
+        for name, builder in (
+            ("str sets/dicts", build_str_structures),
+            ("interned", interned("dict")),
+            ("interned+sqlite", interned("sqlite")),
+            ("interned+bloom", interned("bloom")),
+        ):
+            current, peak, elapsed = measure(builder, args, seed_ids)
+            results[name] = current
+            print(
+                f"{name:>16}: retained {current / 2**20:8.1f} MiB "
+                f"({current / max(discovered, 1):6.1f} B/id), peak {peak / 2**20:8.1f} MiB, "
+                f"{elapsed:6.1f} s"
+            )
+        if sb.cache is not None:
+            sb.cache.close()
+        os.chdir(cwd)
+    for name in ("interned", "interned+sqlite", "interned+bloom"):
+        ratio = results["str sets/dicts"] / max(results[name], 1)
+        print(f"{name} working set is {ratio:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
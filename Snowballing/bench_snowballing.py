@@ -0,0 +1,259 @@
+"""
+Throughput benchmark for snowballing.py and getDoi.py against the offline
+mock server (mock_s2_server.py).
+
+For every seed-set size it runs, in a fresh process (so peak RSS is per
+scenario), one round of run_snowballing plus a standalone fetch_metadata
+pass, and reports papers/s, requests per paper, peak RSS and the time
+spent writing checkpoints. The getDoi.py title lookup loop is timed
+separately on --titles titles (paced at its own 1 request/s limiter).
+
+Usage: python bench_snowballing.py [--sizes 1000,10000,100000] [--latency 0.02]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+POLL_INTERVAL = 1.0  # seconds between checks that a scenario process is still alive
+
+
+def _get_json(url, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as resp:
+        return json.load(resp)
+
+
+def _stats(api_url):
+    return _get_json(f"{api_url}/_stats")
+
+
+def _delta(after, before, key):
+    return after.get(key, 0) - before.get(key, 0)
+
+
+def _run_server(server_args, ready):
+    sys.path.insert(0, HERE)
+    import mock_s2_server
+
+    mock_s2_server.serve(mock_s2_server.build_parser().parse_args(server_args), ready)
+
+
+def _run_scenario(cfg, results):
+    """Run one crawl in this (fresh) process and put its measurements on `results`."""
+    os.environ["S2_API_URL"] = cfg["api_url"]
+    os.chdir(cfg["workdir"])
+    sys.path.insert(0, HERE)
+    from mock_s2_server import paper_id
+    from ratelimit import TokenBucket
+    import snowballing as sb
+
+    sb.cache = None  # measure real requests, not cache hits
+    sb.limiter = TokenBucket(cfg["rps"], cfg["rps"])
+    sb.retry_policy.limiter = sb.limiter
+    sb.MAX_WORKERS = cfg["workers"]
+    sb.BATCH_NEIGHBORS = cfg["batch"]
+
+    checkpoint_time = [0.0]
+
+    def timed(fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                checkpoint_time[0] += time.perf_counter() - start
+
+        return wrapper
+
+    sb.journal.append = timed(sb.journal.append)
+    sb.journal.compact = timed(sb.journal.compact)
+
+    seeds = [paper_id(i) for i in range(cfg["seeds"])]
+    before = _stats(cfg["api_url"])
+    start = time.perf_counter()
+    discovered, _, _ = sb.run_snowballing(seeds, set(seeds), excel_file=None)
+    crawl_time = time.perf_counter() - start
+    after = _stats(cfg["api_url"])
+
+    sample = discovered[: cfg["metadata_ids"]]
+    start = time.perf_counter()
+    sb.fetch_metadata(sample)
+    metadata_time = time.perf_counter() - start
+    after_meta = _stats(cfg["api_url"])
+
+    results.put(
+        {
+            "seeds": cfg["seeds"],
+            "discovered": len(discovered),
+            "crawl_s": crawl_time,
+            "papers_per_s": cfg["seeds"] / crawl_time if crawl_time else 0.0,
+            "requests_per_paper": _delta(after, before, "requests") / max(cfg["seeds"], 1),
+            "http_429": _delta(after, before, "429"),
+            "checkpoint_s": checkpoint_time[0],
+            "checkpoint_share": checkpoint_time[0] / crawl_time if crawl_time else 0.0,
+            "metadata_ids": len(sample),
+            "metadata_ids_per_s": len(sample) / metadata_time if metadata_time else 0.0,
+            "metadata_requests": _delta(after_meta, after, "requests"),
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+    )
+
+
+def bench_titles(api_url, n_titles, workdir):
+    """Time getDoi.py on n_titles mock titles; returns a result dict."""
+    import pandas as pd
+
+    sys.path.insert(0, HERE)
+    from mock_s2_server import paper_id
+
+    papers = _get_json(
+        f"{api_url}/graph/v1/paper/batch?fields=title,year",
+        {"ids": [paper_id(i) for i in range(n_titles)]},
+    )
+    pd.DataFrame(
+        {"Title": [p["title"] for p in papers], "Publication Year": [p["year"] for p in papers]}
+    ).to_excel(os.path.join(workdir, "ForSnowballing.xlsx"), index=False)
+
+    before = _stats(api_url)
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.join(HERE, "getDoi.py")],
+        cwd=workdir,
+        env=dict(os.environ, S2_API_URL=api_url),
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    elapsed = time.perf_counter() - start
+    after = _stats(api_url)
+    out = pd.read_excel(os.path.join(workdir, "papers_with_ids.xlsx"))
+    correct = (out["PaperId"] == [paper_id(i) for i in range(n_titles)]).mean()
+    return {
+        "titles": n_titles,
+        "elapsed_s": elapsed,
+        "titles_per_s": n_titles / elapsed,
+        "requests_per_title": _delta(after, before, "requests") / n_titles,
+        "correct_share": float(correct),
+    }
+
+
+def _scenario_result(proc, results, timeout=None):
+    """The measurements `proc` puts on `results`, or (None, reason) if the
+    process exits without them (crash, OOM kill) or runs past `timeout` s."""
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        try:
+            return results.get(timeout=POLL_INTERVAL), None
+        except queue.Empty:
+            pass
+        if not proc.is_alive():
+            try:  # put just before the process exited
+                return results.get(timeout=POLL_INTERVAL), None
+            except queue.Empty:
+                proc.join()
+                return None, f"scenario process exited with code {proc.exitcode}"
+        if deadline is not None and time.monotonic() > deadline:
+            proc.terminate()
+            proc.join()
+            return None, f"timed out after {timeout:g}s (exit code {proc.exitcode})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated seed counts")
+    parser.add_argument("--graph-factor", type=int, default=3, help="graph papers per seed (largest size)")
+    parser.add_argument("--mean-degree", type=float, default=10)
+    parser.add_argument("--degree-dist", default="lognormal")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock latency per request (s)")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--rps", type=float, default=1000.0, help="client requests-per-second budget")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-paper", action="store_true", help="disable batched neighbor retrieval")
+    parser.add_argument("--metadata-ids", type=int, default=10000)
+    parser.add_argument("--titles", type=int, default=50, help="titles for the getDoi.py loop (0 to skip)")
+    parser.add_argument("--timeout", type=float, help="give up on a scenario after this many seconds")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    ctx = multiprocessing.get_context("spawn")
+    api_url = f"http://127.0.0.1:{args.port}"
+    ready = ctx.Event()
+    server = ctx.Process(
+        target=_run_server,
+        args=(
+            [
+                "--port", str(args.port),
+                "--papers", str(max(sizes) * args.graph_factor),
+                "--mean-degree", str(args.mean_degree),
+                "--degree-dist", args.degree_dist,
+                "--latency", str(args.latency),
+                "--rate-429", str(args.rate_429),
+            ],
+            ready,
+        ),
+        daemon=True,
+    )
+    server.start()
+    ready.wait()
+
+    report = {"snowballing": [], "titles": None}
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as workdir:
+                results = ctx.Queue()
+                cfg = {
+                    "api_url": api_url,
+                    "workdir": workdir,
+                    "seeds": size,
+                    "rps": args.rps,
+                    "workers": args.workers,
+                    "batch": not args.per_paper,
+                    "metadata_ids": args.metadata_ids,
+                }
+                proc = ctx.Process(target=_run_scenario, args=(cfg, results))
+                proc.start()
+                row, error = _scenario_result(proc, results, args.timeout)
+                proc.join()
+            if row is None:
+                report["snowballing"].append({"seeds": size, "error": error})
+                print(f"seeds={size:>7}  failed: {error}")
+                continue
+            report["snowballing"].append(row)
+            print(
+                f"seeds={row['seeds']:>7}  {row['papers_per_s']:8.1f} papers/s  "
+                f"{row['requests_per_paper']:6.3f} req/paper  "
+                f"peak RSS {row['peak_rss_mb']:7.1f} MiB  "
+                f"checkpoint {row['checkpoint_s']:6.2f}s ({100 * row['checkpoint_share']:4.1f}%)  "
+                f"metadata {row['metadata_ids_per_s']:8.1f} ids/s"
+            )
+
+        if args.titles:
+            with tempfile.TemporaryDirectory() as workdir:
+                row = bench_titles(api_url, args.titles, workdir)
+            report["titles"] = row
+            print(
+                f"titles={row['titles']:>6}  {row['titles_per_s']:8.2f} titles/s  "
+                f"{row['requests_per_title']:6.3f} req/title  correct {100 * row['correct_share']:.0f}%"
+            )
+    finally:
+        server.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+State kept between incremental (delta) snowballing runs.
+
+A delta run (snowballing.py --delta) records, for every paper it expands,
+the referenceCount and citationCount the API reported and the neighbor
+ids it got, plus every paper it wrote out. On the next delta run:
+
+  - a paper whose counts are unchanged is answered from the store, so
+    it costs only its share of the count pre-pass (a batch call per
+    COUNT_BATCH_SIZE papers);
+  - a paper with a changed count is fetched again; above the inline
+    limit only the changed direction is requested;
+  - only papers that no earlier run wrote out are emitted, tagged with
+    the run's tag.
+
+  expanded(pid PRIMARY KEY, reference_count, citation_count, refs, cits)
+  seen(pid PRIMARY KEY, tag)   tag of the run that first emitted the paper
+"""
+
+import json
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS expanded (
+    pid TEXT PRIMARY KEY,
+    reference_count INTEGER,
+    citation_count INTEGER,
+    refs TEXT NOT NULL,
+    cits TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS seen (pid TEXT PRIMARY KEY, tag TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+
+class DeltaStore:
+    """SQLite store of expanded papers and emitted ids; thread-safe."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # one commit per expanded paper
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def neighbors(self, pid, counts):
+        """(references, citations) stored for `pid`, each None unless its
+        count still equals `counts` (a (references, citations) pair)."""
+        if counts is None:
+            return None, None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reference_count, citation_count, refs, cits FROM expanded WHERE pid = ?",
+                (pid,),
+            ).fetchone()
+        if row is None:
+            return None, None
+        ref_count, cit_count, refs, cits = row
+        return (
+            json.loads(refs) if ref_count is not None and ref_count == counts[0] else None,
+            json.loads(cits) if cit_count is not None and cit_count == counts[1] else None,
+        )
+
+    def record(self, pid, counts, refs, cits):
+        """Store the neighbors fetched for `pid`; `counts` may be None if unknown."""
+        ref_count, cit_count = counts if counts is not None else (None, None)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO expanded VALUES (?, ?, ?, ?, ?)",
+                (pid, ref_count, cit_count, json.dumps(refs), json.dumps(cits)),
+            )
+
+    def _seen_before(self, pids, tag):
+        seen = set()
+        with self._lock:
+            for start in range(0, len(pids), 900):
+                chunk = pids[start : start + 900]
+                rows = self._conn.execute(
+                    f"SELECT pid FROM seen WHERE tag != ? AND pid IN ({','.join('?' * len(chunk))})",
+                    [tag] + chunk,
+                )
+                seen.update(pid for pid, in rows)
+        return seen
+
+    def new_ids(self, pids, tag):
+        """The ids in `pids` that no run other than `tag` has emitted, in order."""
+        seen = self._seen_before(list(pids), tag)
+        return [pid for pid in pids if pid not in seen]
+
+    def mark_seen(self, pids, tag):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen VALUES (?, ?)", ((pid, tag) for pid in pids)
+            )
+
+    def close(self):
+        self._conn.close()
@@ -3,110 +3,350 @@ Script 1: Automatically obtain DOI and Semantic Scholar PaperId
 based on Title + Year.
 
 Input:  ForSnowballing.xlsx (must contain at least "Title" and
-    "Publication Year" columns)
+    "Publication Year" columns; a "DOI" column is used when present)
 Output: papers_with_ids.xlsx
+
+Each row is resolved by the cheapest tier that works:
+
+  1. manual override (OVERRIDES_FILE), matched by normalized title
+  2. DOI from the sheet, looked up DOI_BATCH_SIZE rows per batch call
+  3. exact title match (/paper/search/match), one small request
+  4. a SEARCH_LIMIT-result search re-ranked locally by title similarity
+     and year (titlematch.py)
+
+Every match gets a Confidence in 0..1; matches below MIN_CONFIDENCE are
+kept but marked "low-confidence" for manual review.
+
+Titles are resolved by MAX_WORKERS threads under the shared token
+bucket. Every result is appended to a checkpoint journal as soon as it
+completes, so an interrupted run resumes with the rows that are still
+missing (or failed). Rows are also appended to STREAM_FILE (a CSV with
+the input row number) as they complete, so progress can be watched or
+used early; the Excel file is written in input order at the end.
 """
 
-from semanticscholar import SemanticScholar
+import csv
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
-import time
 
-sch = SemanticScholar()
+from journal import CheckpointJournal
+from ratelimit import TokenBucket
+from s2cache import ResponseCache
+from s2http import make_client
+from s2retry import RetryPolicy, is_not_found
+from titlematch import YEAR_TOLERANCE, confidence, normalize
+
+# Set S2_API_URL to point at another server (e.g. mock_s2_server.py)
+API_URL = os.environ.get("S2_API_URL")
+
+INPUT_FILE = "ForSnowballing.xlsx"
+OUTPUT_FILE = "papers_with_ids.xlsx"
+
+# Pooled keep-alive session (s2http.py); retries are handled by
+# s2retry.RetryPolicy, not by the client library.
+sch = make_client(API_URL)
+
+# Searches share one token bucket (lowered while the API answers 429) and
+# are retried with jittered backoff.
+REQUESTS_PER_SECOND = 1.0
+MAX_WORKERS = 4  # titles resolved concurrently; all share REQUESTS_PER_SECOND
+limiter = TokenBucket(REQUESTS_PER_SECOND, 1)
+retry_policy = RetryPolicy(limiter)
+
+# Resolution tiers (see above)
+DOI_BATCH_SIZE = 500
+SEARCH_LIMIT = 5  # candidates re-ranked locally when there is no exact title match
+MIN_CONFIDENCE = 0.9
+PAPER_FIELDS = ["paperId", "title", "year", "externalIds"]
+
+# Per-row results of an unfinished run (see journal.py); removed once
+# OUTPUT_FILE is written.
+STATE_PATH = "getDoi_checkpoint.pkl"
+JOURNAL_PATH = "getDoi_checkpoint.journal"
+journal = CheckpointJournal(STATE_PATH, JOURNAL_PATH)
+# Resolved rows in completion order, flushed one by one; removed with the
+# journal. None to skip.
+STREAM_FILE = "papers_with_ids.partial.csv"
+OUTPUT_COLUMNS = ["Title", "Year", "DOI", "PaperId", "LookupStatus", "Confidence", "MatchedTitle"]
+
+# On-disk response cache shared with snowballing.py (set CACHE_PATH = None to disable).
+CACHE_PATH = "s2_cache.sqlite"
+CACHE_TTL = 30 * 24 * 3600  # seconds before a cached search is repeated
+CACHE_MAX_BYTES = 2 * 1024**3
+
+cache = ResponseCache(CACHE_PATH, CACHE_TTL, CACHE_MAX_BYTES) if CACHE_PATH else None
+
+# Manual overrides to avoid matching incorrect papers: a CSV file with
+# Title, DOI and PaperId columns, matched by exact normalized title only,
+# so that an override never applies to a near-identical title (another
+# part, edition or erratum).
+OVERRIDES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manual_overrides.csv")
+
+
+def load_overrides(path: str) -> dict:
+    """{normalized title: {"DOI", "PaperId"}} of the override file; empty if there is none."""
+    table = {}
+    if path and os.path.exists(path):
+        for row in pd.read_csv(path, dtype=str).fillna("").itertuples():
+            table[normalize(row.Title)] = {"DOI": row.DOI, "PaperId": row.PaperId}
+    return table
 
-# Manual override table to avoid matching incorrect papers
-MANUAL_OVERRIDES = {
-    "assigning change requests to software developers": {
-        "DOI": "10.1002/smr.530",
-        "PaperId": "7f9082e47fbb0829426b4c91c7bcc9f0c09718b8",
+
+overrides = load_overrides(OVERRIDES_FILE)
+
+
+def _request(fn):
+    """One API call under the shared limiter and retry policy."""
+
+    def request():
+        limiter.acquire()
+        return fn()
+
+    return retry_policy.call(request)
+
+
+def _cached(endpoint: str, ident: str, fetch):
+    if cache is None:
+        return fetch()
+    return cache.get_or_fetch(ResponseCache.make_key(endpoint, ident, PAPER_FIELDS), fetch)
+
+
+def _paper(p) -> dict:
+    """The fields of a Paper object needed for matching and output."""
+    ext_ids = getattr(p, "externalIds", {}) or {}
+    return {
+        "PaperId": getattr(p, "paperId", "") or "",
+        "DOI": ext_ids.get("DOI") or getattr(p, "doi", "") or "",
+        "Title": getattr(p, "title", "") or "",
+        "Year": getattr(p, "year", None),
     }
-}
 
 
-def normalize_title(value: str) -> str:
-    return (value or "").strip().lower()
+def lookup_dois(dois: list) -> dict:
+    """{doi: paper} for the DOIs Semantic Scholar knows, in batch calls."""
+    found = {}
+    missing = []
+    for doi in dois:
+        cached = cache.get(ResponseCache.make_key("paper/batch", f"DOI:{doi}", PAPER_FIELDS)) if cache else None
+        if cached is None:
+            missing.append(doi)
+        elif cached:  # {} marks a DOI the API does not know
+            found[doi] = cached
+
+    for start in range(0, len(missing), DOI_BATCH_SIZE):
+        batch = missing[start : start + DOI_BATCH_SIZE]
+        papers = _request(
+            lambda: sch.get_papers([f"DOI:{doi}" for doi in batch], fields=PAPER_FIELDS, return_not_found=True)
+        )
+        if isinstance(papers, tuple):
+            papers, _missing = papers
+        by_doi = {}
+        for p in papers:
+            paper = _paper(p)
+            by_doi[paper["DOI"].lower()] = paper
+        for doi in batch:
+            paper = by_doi.get(doi.lower(), {})
+            if paper:
+                found[doi] = paper
+            if cache is not None:
+                cache.set(ResponseCache.make_key("paper/batch", f"DOI:{doi}", PAPER_FIELDS), paper)
+    return found
+
 
+def match_title(title: str) -> dict:
+    """Paper whose title matches `title` exactly (as the API normalizes it), or {}."""
 
-# 1. Read the source Excel file
-df = pd.read_excel("ForSnowballing.xlsx")  # Make sure this file is in the current directory
+    def fetch():
+        try:
+            return _paper(_request(lambda: sch.search_paper(title, fields=PAPER_FIELDS, match_title=True)))
+        except Exception as e:
+            if is_not_found(e):
+                return {}
+            raise
 
-results = []
+    return _cached("paper/search/match", title, fetch)
 
-for idx, row in df.iterrows():
-    title = str(row["Title"]).strip()
-    year_raw = row.get("Publication Year", "")
-    year = int(year_raw) if pd.notna(year_raw) else None
-    key = normalize_title(title)
 
-    # Apply manual override first if available
-    if key in MANUAL_OVERRIDES:
-        override = MANUAL_OVERRIDES[key]
-        results.append(
-            {
-                "Title": title,
-                "Year": year,
-                "DOI": override["DOI"],
-                "PaperId": override["PaperId"],
-                "LookupStatus": "manual-fixed",
-            }
+def search_candidates(title: str, year) -> list:
+    """The first SEARCH_LIMIT search results for `title` around `year`."""
+
+    def fetch():
+        years = f"{year - YEAR_TOLERANCE}-{year + YEAR_TOLERANCE}" if year is not None else None
+        results = _request(
+            lambda: sch.search_paper(title, year=years, fields=PAPER_FIELDS, limit=SEARCH_LIMIT)
         )
-        print(f"[MANUAL] {title} -> DOI: {override['DOI']}")
-        continue
+        return [_paper(p) for p in results.items[:SEARCH_LIMIT]]
+
+    return _cached("paper/search", f"{title}|{year}|{SEARCH_LIMIT}", fetch)
+
 
+def _row(title: str, year, paper: dict, status: str, score: float) -> dict:
+    return {
+        "Title": title,
+        "Year": year,
+        "DOI": paper.get("DOI", ""),
+        "PaperId": paper.get("PaperId", ""),
+        "LookupStatus": status,
+        "Confidence": round(score, 3),
+        "MatchedTitle": paper.get("Title", ""),
+    }
+
+
+def find_override(title: str):
+    """Override entry for `title` (exact normalized match), or None."""
+    return overrides.get(normalize(title))
+
+
+def resolve(title: str, year) -> dict:
+    """Output row for one title without a usable DOI: exact title match,
+    else the best of a few search results."""
     print("Searching:", title, "(", year if year is not None else "N/A", ")")
 
     try:
-        # Search papers on Semantic Scholar
-        kwargs = {"title": title}
-        if year is not None:
-            kwargs["year"] = year
-        papers = sch.search_paper(title, year=year) if year is not None else sch.search_paper(title)
-        if papers:
-            p = papers[0]  # Take the most relevant result
-
-            # Safely obtain DOI and PaperId
-            doi = ""
-            ext_ids = getattr(p, "externalIds", {}) or {}
-            doi = ext_ids.get("DOI") or getattr(p, "doi", "") or ""
-            paper_id = getattr(p, "paperId", "") or ""
-
-            results.append(
-                {
-                    "Title": title,
-                    "Year": year,
-                    "DOI": doi,
-                    "PaperId": paper_id,
-                    "LookupStatus": "ok",
-                }
-            )
-            print(f"[OK] {title} -> DOI: {doi or 'N/A'}")
-        else:
-            results.append(
-                {
-                    "Title": title,
-                    "Year": year,
-                    "DOI": "",
-                    "PaperId": "",
-                    "LookupStatus": "not-found",
-                }
-            )
-            print(f"[NOT FOUND] {title}")
-
+        paper = match_title(title)
+        score = confidence(title, year, paper["Title"], paper["Year"]) if paper else 0.0
+        status = "title-match"
+        if score < MIN_CONFIDENCE:
+            candidates = search_candidates(title, year)
+            scored = [(confidence(title, year, c["Title"], c["Year"]), c) for c in candidates]
+            if paper:
+                scored.append((score, paper))
+            score, paper = max(scored, key=lambda s: s[0], default=(0.0, {}))
+            status = "search" if score >= MIN_CONFIDENCE else "low-confidence"
     except Exception as e:
         print("Error:", e)
-        results.append(
-            {
-                "Title": title,
-                "Year": year,
-                "DOI": "",
-                "PaperId": "",
-                "LookupStatus": f"error:{e}",
-            }
-        )
+        return _row(title, year, {}, f"error:{e}", 0.0)
+
+    if not paper:
+        print(f"[NOT FOUND] {title}")
+        return _row(title, year, {}, "not-found", 0.0)
+    print(f"[{status.upper()} {score:.2f}] {title} -> DOI: {paper['DOI'] or 'N/A'}")
+    return _row(title, year, paper, status, score)
+
+
+def _clean_doi(value) -> str:
+    doi = str(value).strip() if pd.notna(value) else ""
+    for prefix in ("https://doi.org/", "http://doi.org/", "http://dx.doi.org/", "doi:"):
+        if doi.lower().startswith(prefix):
+            doi = doi[len(prefix) :]
+    return doi
+
+
+def read_titles(path: str) -> list:
+    """[(row, title, year, doi)] from the input sheet."""
+    df = pd.read_excel(path)
+    rows = []
+    for idx, row in df.iterrows():
+        title = str(row["Title"]).strip()
+        year_raw = row.get("Publication Year", "")
+        year = int(year_raw) if pd.notna(year_raw) else None
+        rows.append((int(idx), title, year, _clean_doi(row.get("DOI", ""))))
+    return rows
+
+
+def _fingerprint(rows) -> str:
+    """Identifies the input a checkpoint belongs to."""
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+
+def resolve_all(rows) -> dict:
+    """{row: result} for every row, resuming from the checkpoint journal.
+
+    Rows already resolved by an interrupted run for the same input are
+    skipped; rows that failed with an error are tried again.
+    """
+    fingerprint = _fingerprint(rows)
+    state, events = journal.load()
+    results = {}
+    if state is not None and state.get("input") == fingerprint:
+        for event in events:
+            if not event["LookupStatus"].startswith("error"):
+                results[event["row"]] = {k: v for k, v in event.items() if k not in ("row", "seq")}
+        print(f"Resuming: {len(results)} of {len(rows)} titles already resolved")
+    else:
+        journal.compact({"input": fingerprint})
+
+    stream = open(STREAM_FILE, "w", newline="", encoding="utf-8") if STREAM_FILE else None
+    writer = None
+    if stream is not None:
+        writer = csv.DictWriter(stream, ["Row"] + OUTPUT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(dict(result, Row=idx) for idx, result in sorted(results.items()))
+        stream.flush()
+
+    def done(idx, result):
+        results[idx] = result
+        journal.append(dict(result, row=idx))
+        if writer is not None:
+            writer.writerow(dict(result, Row=idx))
+            stream.flush()
+
+    try:
+        todo = []
+        for idx, title, year, doi in rows:
+            if idx in results:
+                continue
+            override = find_override(title)
+            if override is not None:
+                print(f"[MANUAL] {title} -> DOI: {override['DOI']}")
+                done(idx, _row(title, year, dict(override, Title=title), "manual-fixed", 1.0))
+            else:
+                todo.append((idx, title, year, doi))
+
+        with_doi = [row for row in todo if row[3]]
+        if with_doi:
+            try:
+                found = lookup_dois([doi for _, _, _, doi in with_doi])
+            except Exception as e:
+                print(f"DOI lookup failed, resolving those rows by title: {e}")
+                found = {}
+            for idx, title, year, doi in with_doi:
+                if doi in found:
+                    print(f"[DOI] {title} -> {found[doi]['PaperId']}")
+                    done(idx, _row(title, year, found[doi], "doi", 1.0))
+            print(f"Resolved {len(found)} of {len(with_doi)} rows by DOI")
+            todo = [row for row in todo if row[0] not in results]
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = {pool.submit(resolve, title, year): idx for idx, title, year, _ in todo}
+            for future in as_completed(futures):
+                done(futures[future], future.result())
+    finally:
+        if stream is not None:
+            stream.close()
+    return results
+
+
+def clear_progress():
+    """Remove the journal and STREAM_FILE once the results are saved."""
+    journal.clear()
+    if STREAM_FILE and os.path.exists(STREAM_FILE):
+        os.remove(STREAM_FILE)
+
+
+def summarize(results) -> str:
+    """One line with the number of rows per LookupStatus."""
+    statuses = pd.Series([r["LookupStatus"] for r in results], dtype=object)
+    counts = statuses.str.replace(r"^error:.*", "error", regex=True).value_counts()
+    return ", ".join(f"{status}: {n}" for status, n in counts.items())
+
+
+def main():
+    # 1. Read the source Excel file
+    rows = read_titles(INPUT_FILE)  # Make sure this file is in the current directory
+    results = resolve_all(rows)
+
+    # Save results to Excel, in input order
+    ordered = [results[idx] for idx, _, _, _ in rows]
+    pd.DataFrame(ordered).to_excel(OUTPUT_FILE, index=False)
+    clear_progress()
 
-    time.sleep(1)  # Avoid hitting API rate limits
+    print("\n" + summarize(ordered))
+    print(f"Saved: {OUTPUT_FILE}")
 
-# Save results to Excel
-out_df = pd.DataFrame(results)
-out_df.to_excel("papers_with_ids.xlsx", index=False)
 
-print("\nSaved: papers_with_ids.xlsx")
+if __name__ == "__main__":
+    main()
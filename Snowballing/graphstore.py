@@ -0,0 +1,187 @@
+"""
+On-disk citation graph for snowballing results.
+
+While crawling, every citation edge returned by the API (not only the
+first source that led to a new paper) is appended to a binary edge log
+as int32 pairs (citing, cited) of interned ids (see idstore.py). At the
+end of the run the log is turned into a CSR graph directory:
+
+  offsets.npy    int64[n + 1]  references of node i are
+  neighbors.npy  int32[m]      neighbors[offsets[i]:offsets[i + 1]]
+  ids.npy        bytes[n]      paper id of node i
+
+Edges are deduplicated and sorted. CitationGraph.load() memory-maps the
+arrays, so in-degree, coupling or co-citation over millions of edges are
+plain NumPy operations, e.g.
+
+  g = CitationGraph.load("snowball_graph")
+  most_cited = g.ids[np.argsort(g.in_degree())[::-1][:20]]
+"""
+
+import os
+from array import array
+
+import numpy as np
+
+EDGE_DTYPE = np.int32
+
+
+class EdgeLog:
+    """Append-only (citing, cited) log; its byte length is the resume point."""
+
+    def __init__(self, path, resume_at=None):
+        """Start a new log, or keep the first `resume_at` bytes of an existing one."""
+        self.path = path
+        if resume_at is None:
+            self._file = open(path, "wb")
+        else:
+            self._file = open(path, "ab")
+            size = self._file.tell()
+            if size < resume_at:
+                print(f"    Edge log {path} is shorter than its checkpoint; graph will miss edges")
+            self._file.truncate(min(size, resume_at))
+            self._file.seek(0, os.SEEK_END)
+
+    def append_paper(self, src, backward, forward):
+        """Log src -> each backward id and each forward id -> src.
+
+        Returns the log length after the write, to be stored with the
+        checkpoint so a resume can cut off edges of unrecorded papers.
+        """
+        pairs = array("i")
+        for idx in backward:
+            pairs.append(src)
+            pairs.append(idx)
+        for idx in forward:
+            pairs.append(idx)
+            pairs.append(src)
+        pairs.tofile(self._file)
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def dedup_edges(citing, cited, n):
+    """Deduplicated (citing, cited) arrays sorted by citing, then cited;
+    ids are < `n`."""
+    keys = np.unique(np.asarray(citing, dtype=np.int64) * n + cited)
+    return (keys // n).astype(EDGE_DTYPE), (keys % n).astype(EDGE_DTYPE)
+
+
+def read_edges(edge_path, n):
+    """(citing, cited) arrays of the logged edges, deduplicated and sorted;
+    `n` is the number of interned ids."""
+    edges = np.fromfile(edge_path, dtype=EDGE_DTYPE).reshape(-1, 2)
+    return dedup_edges(edges[:, 0], edges[:, 1], n)
+
+
+def csr_offsets(citing, n):
+    """CSR offsets for edges sorted by `citing`."""
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(citing, minlength=n), out=offsets[1:])
+    return offsets
+
+
+def save_arrays(directory, arrays):
+    """np.save each {name: array} as directory/name.npy, atomically per file."""
+    os.makedirs(directory, exist_ok=True)
+    for name, arr in arrays.items():
+        tmp_path = os.path.join(directory, f"{name}.tmp.npy")
+        np.save(tmp_path, arr)
+        os.replace(tmp_path, os.path.join(directory, f"{name}.npy"))
+
+
+def build_graph(edge_path, ids, graph_dir):
+    """Write the CSR graph for the edge log at `edge_path`.
+
+    ids: list of paper id strings, indexed by interned id.
+    Returns (nodes, edges).
+    """
+    n = len(ids)
+    citing, neighbors = read_edges(edge_path, n)
+    save_arrays(
+        graph_dir,
+        {
+            "offsets": csr_offsets(citing, n),
+            "neighbors": neighbors,
+            "ids": np.array([pid.encode() for pid in ids], dtype=bytes),
+        },
+    )
+    return n, len(neighbors)
+
+
+class CitationGraph:
+    """CSR adjacency (citing -> cited) over the crawled papers."""
+
+    def __init__(self, offsets, neighbors, ids):
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.ids = ids
+        self._index = None
+        self._citers = None
+
+    @classmethod
+    def load(cls, graph_dir, mmap=True):
+        mode = "r" if mmap else None
+        return cls(
+            np.load(os.path.join(graph_dir, "offsets.npy"), mmap_mode=mode),
+            np.load(os.path.join(graph_dir, "neighbors.npy"), mmap_mode=mode),
+            np.load(os.path.join(graph_dir, "ids.npy"), mmap_mode=mode),
+        )
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def num_edges(self):
+        return len(self.neighbors)
+
+    def index(self, pid):
+        """Node of paper id `pid` (KeyError if it is not in the graph)."""
+        if self._index is None:
+            self._index = {bytes(key): i for i, key in enumerate(self.ids)}
+        return self._index[pid.encode()]
+
+    def paper_id(self, node):
+        return self.ids[node].decode()
+
+    def references(self, node):
+        """Nodes cited by `node`."""
+        return self.neighbors[self.offsets[node] : self.offsets[node + 1]]
+
+    def citations(self, node):
+        """Nodes citing `node`."""
+        return self.transpose().references(node)
+
+    def out_degree(self):
+        return np.diff(self.offsets)
+
+    def in_degree(self):
+        return np.bincount(self.neighbors, minlength=len(self))
+
+    def transpose(self):
+        """The cited -> citing graph (computed once, kept in memory)."""
+        if self._citers is None:
+            citing = np.repeat(np.arange(len(self), dtype=EDGE_DTYPE), self.out_degree())
+            order = np.argsort(self.neighbors, kind="stable")
+            offsets = np.zeros(len(self) + 1, dtype=np.int64)
+            np.cumsum(self.in_degree(), out=offsets[1:])
+            self._citers = CitationGraph(offsets, citing[order], self.ids)
+            self._citers._citers = self
+        return self._citers
+
+    def coupling(self, a, b):
+        """Bibliographic coupling: references shared by nodes a and b."""
+        return len(np.intersect1d(self.references(a), self.references(b), assume_unique=True))
+
+    def co_citation(self, a, b):
+        """Co-citation: papers citing both a and b."""
+        citers = self.transpose()
+        return len(np.intersect1d(citers.references(a), citers.references(b), assume_unique=True))
@@ -0,0 +1,154 @@
+"""
+Compact interned-id working set for snowballing.
+
+Semantic Scholar paper ids are 40-character hex strings. Instead of
+keeping them as Python str in several sets, lists and dicts, IdTable
+interns each id once as 20 raw bytes and hands out a dense integer
+index. Per-id state lives in a one-byte flag array and discovery
+sources live in array-backed linked lists, so the crawl only holds
+small integers and decodes back to hex when writing output. The id ->
+int lookup is pluggable (see idindex.py) so very large crawls can keep
+it on disk.
+"""
+
+from array import array
+
+from idindex import make_index
+
+# Per-id flag bits (IdTable.flags)
+PROCESSED = 1  # seed or found in a completed round: never fetched again
+IN_ROUND = 2  # discovered in the current round
+BACKWARD = 4  # reached through a reference
+FORWARD = 8  # reached through a citation
+
+DIRECTION_NAMES = {BACKWARD: "backward", FORWARD: "forward"}
+DIRECTION_FLAGS = {name: flag for flag, name in DIRECTION_NAMES.items()}
+
+_RAW_SIZE = 20
+_EMPTY_RAW = bytes(_RAW_SIZE)
+
+
+def _encode(pid):
+    """20-byte key for a 40-hex id, or the str itself for any other id format."""
+    if len(pid) == 2 * _RAW_SIZE:
+        try:
+            return bytes.fromhex(pid)
+        except ValueError:
+            pass
+    return pid
+
+
+class IdTable:
+    """Bidirectional map between paper id strings and dense ints, plus flags."""
+
+    def __init__(self, index=None):
+        self._index = index if index is not None else make_index()  # key -> dense int
+        self._raw = bytearray()  # dense int i -> bytes [20 * i, 20 * i + 20)
+        self._odd = {}  # dense int -> str for ids that are not 40-hex
+        self.flags = bytearray()
+
+    def __len__(self):
+        return len(self.flags)
+
+    def get(self, pid):
+        """Dense index of `pid`, or None if it was never interned."""
+        return self._index.get(_encode(pid))
+
+    def intern(self, pid):
+        """Dense index of `pid`, adding it (with zero flags) if needed."""
+        key = _encode(pid)
+        idx = self._index.get(key)
+        if idx is None:
+            idx = len(self.flags)
+            self._index.add(key, idx)
+            if isinstance(key, bytes):
+                self._raw += key
+            else:
+                self._raw += _EMPTY_RAW
+                self._odd[idx] = key
+            self.flags.append(0)
+        return idx
+
+    def decode(self, idx):
+        odd = self._odd.get(idx)
+        if odd is not None:
+            return odd
+        start = idx * _RAW_SIZE
+        return self._raw[start : start + _RAW_SIZE].hex()
+
+    def decode_many(self, indices):
+        return [self.decode(i) for i in indices]
+
+    def with_flag(self, flag):
+        """Dense indices whose flags include `flag`, in interning order."""
+        return [i for i, f in enumerate(self.flags) if f & flag]
+
+    def count_flag(self, flag):
+        return sum(1 for f in self.flags if f & flag)
+
+    @property
+    def index_spec(self):
+        return self._index.spec
+
+    def close(self):
+        """Release the index (decode() keeps working)."""
+        self._index.close()
+
+    # The index is rebuilt on load, so snapshots only carry the raw bytes
+    # and the index spec.
+    def __getstate__(self):
+        return {"raw": self._raw, "odd": self._odd, "flags": self.flags, "index": self._index.spec}
+
+    def __setstate__(self, state):
+        self._raw = state["raw"]
+        self._odd = state["odd"]
+        self.flags = state["flags"]
+        self._index = make_index(state.get("index"))
+        self._index.rebuild(self._keys())
+
+    def _keys(self):
+        raw = bytes(self._raw)
+        for idx in range(len(self.flags)):
+            odd = self._odd.get(idx)
+            if odd is not None:
+                yield odd, idx
+            else:
+                start = idx * _RAW_SIZE
+                yield raw[start : start + _RAW_SIZE], idx
+
+
+class SourceLists:
+    """Array-backed per-id lists of (source index, direction flag) pairs.
+
+    Edges are stored in parallel arrays and chained per target id, so
+    appending a source is O(1) and costs a few bytes per edge.
+    """
+
+    def __init__(self):
+        self._head = array("l")  # target index -> last edge, or -1
+        self._next = array("l")  # edge -> previous edge for the same target
+        self._source = array("l")  # edge -> source index
+        self._direction = bytearray()  # edge -> direction flag
+
+    def add(self, target, source, direction):
+        if target >= len(self._head):
+            self._head.extend([-1] * (target + 1 - len(self._head)))
+        self._next.append(self._head[target])
+        self._source.append(source)
+        self._direction.append(direction)
+        self._head[target] = len(self._source) - 1
+
+    def get(self, target):
+        """[(source index, direction flag), ...] in insertion order."""
+        if target >= len(self._head):
+            return []
+        out = []
+        edge = self._head[target]
+        while edge != -1:
+            out.append((self._source[edge], self._direction[edge]))
+            edge = self._next[edge]
+        out.reverse()
+        return out
+
+    def __len__(self):
+        return len(self._source)
@@ -0,0 +1,118 @@
+"""
+Crash-safe checkpointing: an atomic snapshot plus an append-only journal.
+
+The snapshot is a pickled state dict written to a temp file, fsync'd and
+renamed over the previous one, so a crash never leaves a half-written
+checkpoint. Between snapshots, per-paper results are appended to a JSON
+lines journal and fsync'd, which costs O(new work) per checkpoint
+instead of re-pickling the whole state. Every event carries a sequence
+number and the snapshot records the last one it includes, so events
+already folded into a snapshot are skipped on recovery even if the
+journal could not be truncated before a crash.
+"""
+
+import json
+import os
+import pickle
+
+
+def _fsync_dir(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows, where directories cannot be opened
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class CheckpointJournal:
+    """Snapshot file + append-only journal of events since that snapshot."""
+
+    def __init__(self, snapshot_path, journal_path):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.seq = 0
+        self.events_since_snapshot = 0
+        self._fh = None
+
+    def _open(self):
+        if self._fh is None:
+            self._fh = open(self.journal_path, "a", encoding="utf-8")
+        return self._fh
+
+    def append(self, event):
+        """Durably append one event (a JSON-serializable dict)."""
+        self.seq += 1
+        record = dict(event, seq=self.seq)
+        fh = self._open()
+        fh.write(json.dumps(record, separators=(",", ":")) + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+        self.events_since_snapshot += 1
+
+    def compact(self, state):
+        """Atomically write `state` as the new snapshot and truncate the journal."""
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"seq": self.seq, "state": state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        _fsync_dir(self.snapshot_path)
+
+        if self._fh is not None:
+            self._fh.close()
+        self._fh = open(self.journal_path, "w", encoding="utf-8")
+        os.fsync(self._fh.fileno())
+        self.events_since_snapshot = 0
+
+    def load(self):
+        """Return (snapshot_state, events_after_snapshot), or (None, []) if absent.
+
+        A torn last line (crash mid-append) is dropped and truncated away so
+        later appends start on a clean line.
+        """
+        if not os.path.exists(self.snapshot_path):
+            return None, []
+        with open(self.snapshot_path, "rb") as f:
+            payload = pickle.load(f)
+        if isinstance(payload, dict) and "state" in payload and "seq" in payload:
+            snapshot_seq, state = payload["seq"], payload["state"]
+        else:  # plain pickled state from before the journal existed
+            snapshot_seq, state = 0, payload
+
+        events = []
+        self.seq = snapshot_seq
+        if os.path.exists(self.journal_path):
+            good_bytes = 0
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    good_bytes += len(line)
+                    if event["seq"] > snapshot_seq:
+                        events.append(event)
+                        self.seq = event["seq"]
+            if good_bytes != os.path.getsize(self.journal_path):
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(good_bytes)
+        self.events_since_snapshot = len(events)
+        return state, events
+
+    def clear(self):
+        """Close the journal and delete both files."""
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        for path in (self.snapshot_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.seq = 0
+        self.events_since_snapshot = 0
@@ -0,0 +1,234 @@
+"""
+Lightweight run instrumentation for snowballing.
+
+Records per-operation latency histograms (API endpoints as well as local
+stages such as checkpointing and rate-limit waits), error/event counters,
+response bytes and crawl progress (papers/s, ETA). A background thread
+writes everything in Prometheus text format to a metrics file at a fixed
+interval and can also serve it on http://<host>:<port>/metrics, so a
+multi-hour crawl can be watched while it runs.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_WINDOW = 60.0  # seconds of history used for papers/s and ETA
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.n += 1
+
+    def quantile(self, q):
+        """Upper bucket bound containing quantile q (coarse, like Prometheus)."""
+        target = q * self.n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return 0.0
+
+
+class Metrics:
+    """Thread-safe metric registry with a periodic Prometheus text exporter."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = defaultdict(_Histogram)
+        self._errors = defaultdict(int)
+        self._bytes = defaultdict(int)
+        self._events = defaultdict(int)
+        self._done = 0
+        self._total = 0
+        self._history = deque()
+        self._started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+        self.path = None
+
+    @contextmanager
+    def timer(self, op):
+        """Time a block as `op`; exceptions are counted as errors and re-raised.
+
+        The yielded object has add_bytes(n) for recording response sizes.
+        """
+        recorder = _BytesRecorder()
+        start = time.perf_counter()
+        try:
+            yield recorder
+        except BaseException:
+            with self._lock:
+                self._errors[op] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._latency[op].observe(elapsed)
+                self._bytes[op] += recorder.bytes
+
+    def event(self, name, n=1):
+        with self._lock:
+            self._events[name] += n
+
+    def calls(self, *ops):
+        """Number of timed calls of the given operations so far."""
+        with self._lock:
+            return sum(self._latency[op].n for op in ops if op in self._latency)
+
+    def progress(self, done, total):
+        now = time.monotonic()
+        with self._lock:
+            self._done, self._total = done, total
+            self._history.append((now, done))
+            while self._history and now - self._history[0][0] > RATE_WINDOW:
+                self._history.popleft()
+
+    def _rate_locked(self):
+        if len(self._history) < 2:
+            return 0.0
+        (t0, d0), (t1, d1) = self._history[0], self._history[-1]
+        return (d1 - d0) / (t1 - t0) if t1 > t0 and d1 >= d0 else 0.0
+
+    def rate_and_eta(self):
+        """(papers per second over the last RATE_WINDOW s, ETA in seconds or None)."""
+        with self._lock:
+            rate = self._rate_locked()
+            remaining = self._total - self._done
+        return rate, (remaining / rate if rate > 0 else None)
+
+    def render(self):
+        """All metrics in Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# TYPE snowball_op_seconds histogram",
+            ]
+            for op, hist in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float("inf"),), hist.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'snowball_op_seconds_bucket{{op="{op}",le="{le}"}} {cumulative}')
+                lines.append(f'snowball_op_seconds_sum{{op="{op}"}} {hist.total:.6f}')
+                lines.append(f'snowball_op_seconds_count{{op="{op}"}} {hist.n}')
+            lines.append("# TYPE snowball_op_errors_total counter")
+            for op, count in sorted(self._errors.items()):
+                lines.append(f'snowball_op_errors_total{{op="{op}"}} {count}')
+            lines.append("# TYPE snowball_op_bytes_total counter")
+            for op, count in sorted(self._bytes.items()):
+                lines.append(f'snowball_op_bytes_total{{op="{op}"}} {count}')
+            lines.append("# TYPE snowball_events_total counter")
+            for name, count in sorted(self._events.items()):
+                lines.append(f'snowball_events_total{{event="{name}"}} {count}')
+            rate = self._rate_locked()
+            remaining = self._total - self._done
+            lines += [
+                "# TYPE snowball_papers_done gauge",
+                f"snowball_papers_done {self._done}",
+                "# TYPE snowball_papers_total gauge",
+                f"snowball_papers_total {self._total}",
+                "# TYPE snowball_papers_per_second gauge",
+                f"snowball_papers_per_second {rate:.4f}",
+                "# TYPE snowball_eta_seconds gauge",
+                f"snowball_eta_seconds {remaining / rate if rate > 0 else -1:.1f}",
+                "# TYPE snowball_uptime_seconds gauge",
+                f"snowball_uptime_seconds {time.monotonic() - self._started:.1f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, self.path)
+
+    def start(self, path=None, port=None, interval=10.0, host="127.0.0.1"):
+        """Export to `path` every `interval` seconds and/or serve on `port`."""
+        self.path = path
+        if port:
+            metrics = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def log_message(self, fmt, *args):
+                    pass
+
+                def do_GET(self):
+                    body = metrics.render().encode()
+                    self.send_response(200 if self.path == "/metrics" else 404)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            self._server = ThreadingHTTPServer((host, port), Handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            print(f"  Metrics served on http://{host}:{port}/metrics")
+        if path:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._export_loop, args=(interval,), daemon=True)
+            self._thread.start()
+
+    def _export_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"    Failed to write metrics to {self.path}: {e}")
+
+    def stop(self):
+        """Stop exporting and write the final metrics file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+        self.write()
+
+    def summary(self):
+        """Human-readable per-operation table (sorted by total time)."""
+        with self._lock:
+            rows = sorted(self._latency.items(), key=lambda kv: -kv[1].total)
+            lines = [
+                f"  {'operation':<20}{'calls':>9}{'total s':>11}{'mean s':>9}"
+                f"{'p95 <=':>9}{'errors':>8}{'MiB':>9}"
+            ]
+            for op, hist in rows:
+                lines.append(
+                    f"  {op:<20}{hist.n:>9}{hist.total:>11.1f}"
+                    f"{hist.total / max(hist.n, 1):>9.3f}{hist.quantile(0.95):>9.3g}"
+                    f"{self._errors.get(op, 0):>8}{self._bytes.get(op, 0) / 2**20:>9.1f}"
+                )
+            for name, count in sorted(self._events.items()):
+                lines.append(f"  event {name}: {count}")
+        return "\n".join(lines)
+
+
+class _BytesRecorder:
+    def __init__(self):
+        self.bytes = 0
+
+    def add_bytes(self, n):
+        self.bytes += n
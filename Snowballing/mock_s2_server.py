@@ -0,0 +1,379 @@
+"""
+Offline stand-in for the Semantic Scholar Graph API.
+
+Serves a synthetic citation graph on the endpoints snowballing.py and
+getDoi.py use, so both can be measured and tuned without touching the
+live API or its rate limits:
+
+  GET  /graph/v1/paper/{id}                      (get_paper)
+  POST /graph/v1/paper/batch                     (get_papers)
+  GET  /graph/v1/paper/{id}/references           (paginated)
+  GET  /graph/v1/paper/{id}/citations            (paginated)
+  GET  /graph/v1/paper/search                    (search_paper)
+  GET  /graph/v1/paper/search/match              (search_paper(match_title=True))
+  GET  /_stats                                   request, connection and byte counters (JSON)
+
+Graph size, degree distribution, per-request latency and the share of
+requests answered with 429 are configurable. Point the scripts at it with
+S2_API_URL=http://127.0.0.1:8765.
+
+Usage: python mock_s2_server.py --papers 10000 --mean-degree 10 --latency 0.05 --rate-429 0.01
+
+With --dump-dataset DIR the same graph is written as a Datasets API bulk
+dump (gzipped papers/ and citations/ JSON lines, corpus id = paper index)
+for snowballing.py --dataset, and the server is not started.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+_WORDS = (
+    "feature request user review app store issue tracker classification "
+    "prioritization detection duplicate recommendation mining analysis "
+    "software requirements elicitation deep learning transformer neural "
+    "crowd feedback open source developer community evolution release "
+    "planning sentiment topic model clustering empirical study approach "
+    "automated tool survey dataset benchmark quality maintenance mobile "
+    "bug report triage ranking extraction semantic similarity retrieval"
+).split()
+
+
+def paper_id(i):
+    return hashlib.sha1(f"mock-paper-{i}".encode()).hexdigest()
+
+
+def _tokens(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+class SyntheticGraph:
+    """Deterministic random citation graph with titles, years and DOIs."""
+
+    def __init__(self, papers, mean_degree=10, degree_dist="lognormal", seed=0):
+        rng = random.Random(seed)
+        self.ids = [paper_id(i) for i in range(papers)]
+        self.index = {pid: i for i, pid in enumerate(self.ids)}
+        self.titles = []
+        self.years = []
+        for i in range(papers):
+            words = rng.sample(_WORDS, 6)
+            self.titles.append(" ".join(words).capitalize() + f" {i}")
+            self.years.append(2000 + rng.randrange(25))
+
+        self.references = [array("l") for _ in range(papers)]
+        self.citations = [array("l") for _ in range(papers)]
+        cited = array("l")  # every edge target so far, for preferential attachment
+        for i in range(papers):
+            degree = self._degree(rng, mean_degree, degree_dist)
+            seen = set()
+            for _ in range(min(degree, papers - 1)):
+                if cited and rng.random() < 0.5:
+                    target = cited[rng.randrange(len(cited))]
+                else:
+                    target = rng.randrange(papers)
+                if target == i or target in seen:
+                    continue
+                seen.add(target)
+                self.references[i].append(target)
+                self.citations[target].append(i)
+                cited.append(target)
+
+        self.dois = {f"10.5555/mock.{i}": i for i in range(papers)}
+        self.exact_titles = {" ".join(_tokens(title)): i for i, title in enumerate(self.titles)}
+        self.title_index = {}
+        for i, title in enumerate(self.titles):
+            for token in set(_tokens(title)):
+                self.title_index.setdefault(token, []).append(i)
+
+    @staticmethod
+    def _degree(rng, mean, dist):
+        if dist == "fixed":
+            return int(mean)
+        if dist == "uniform":
+            return rng.randint(0, 2 * int(mean))
+        if dist == "powerlaw":
+            # Pareto with alpha=2 has mean 2 * xm
+            return int(rng.paretovariate(2.0) * mean / 2)
+        # lognormal with sigma=1 has mean exp(mu + 0.5)
+        return int(rng.lognormvariate(0, 1.0) * mean / 1.6487)
+
+    def paper_json(self, i, fields, inline_limit):
+        out = {"paperId": self.ids[i]}
+        for field in fields:
+            if field == "title":
+                out["title"] = self.titles[i]
+            elif field == "year":
+                out["year"] = self.years[i]
+            elif field == "externalIds":
+                out["externalIds"] = {"DOI": f"10.5555/mock.{i}", "CorpusId": i}
+            elif field == "referenceCount":
+                out["referenceCount"] = len(self.references[i])
+            elif field == "citationCount":
+                out["citationCount"] = len(self.citations[i])
+            elif field.startswith("references"):
+                out["references"] = [
+                    {"paperId": self.ids[j]} for j in self.references[i][:inline_limit]
+                ]
+            elif field.startswith("citations"):
+                out["citations"] = [
+                    {"paperId": self.ids[j]} for j in self.citations[i][:inline_limit]
+                ]
+        return out
+
+    def lookup(self, pid):
+        """Index of a paper id, "DOI:..." or "CorpusId:..." reference."""
+        if pid.upper().startswith("DOI:"):
+            return self.dois.get(pid[4:])
+        if pid.startswith("CorpusId:"):
+            i = int(pid[9:]) if pid[9:].isdigit() else -1
+            return i if 0 <= i < len(self.ids) else None
+        return self.index.get(pid)
+
+    def search(self, query, year=None, limit=10):
+        scores = Counter()
+        for token in set(_tokens(query)):
+            postings = self.title_index.get(token, ())
+            for i in postings:
+                scores[i] += 1 / len(postings)  # rare words weigh more, as in a real ranker
+        first, dash, last = str(year or "").partition("-")  # "2019", "2019-2021", "2019-" or "-2021"
+        first = int(first) if first else 0
+        last = int(last) if last else (9999 if dash else first)
+        hits = [
+            i
+            for i, _ in scores.most_common()
+            if year is None or first <= self.years[i] <= last
+        ]
+        return hits[:limit]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockS2/1.0"
+
+    def log_message(self, fmt, *args):  # keep benchmark output clean
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        gzipped = len(body) > 1024 and "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count("bytes", len(body))
+
+    def _throttle(self, endpoint):
+        cfg = self.server.config
+        self.server.count(endpoint)
+        if cfg["latency"]:
+            time.sleep(cfg["latency"] * random.uniform(0.5, 1.5))
+        if cfg["rate_429"] and random.random() < cfg["rate_429"]:
+            self.server.count("429")
+            self._send(429, {"message": "Too Many Requests"}, {"Retry-After": "1"})
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        fields = [f for f in params.get("fields", "").split(",") if f]
+        graph = self.server.graph
+        inline_limit = self.server.config["inline_limit"]
+
+        if url.path == "/_stats":
+            with self.server.lock:
+                stats = dict(self.server.stats)
+            self._send(200, stats)
+            return
+
+        m = re.fullmatch(r"/graph/v1/paper/search/match", url.path)
+        if m:
+            if self._throttle("match"):
+                return
+            i = graph.exact_titles.get(" ".join(_tokens(params.get("query", ""))))
+            if i is None:
+                self._send(404, {"error": "Title match not found"})
+                return
+            paper = dict(graph.paper_json(i, fields, inline_limit), matchScore=100.0)
+            self._send(200, {"data": [paper]})
+            return
+
+        m = re.fullmatch(r"/graph/v1/paper/search", url.path)
+        if m:
+            if self._throttle("search"):
+                return
+            limit = int(params.get("limit", 10))
+            hits = graph.search(params.get("query", ""), params.get("year"), limit)
+            self._send(
+                200,
+                {
+                    "total": len(hits),
+                    "offset": 0,
+                    "data": [graph.paper_json(i, fields, inline_limit) for i in hits],
+                },
+            )
+            return
+
+        m = re.fullmatch(r"/graph/v1/paper/([^/]+)/(references|citations)", url.path)
+        if m:
+            pid, kind = m.groups()
+            if self._throttle(kind):
+                return
+            i = graph.index.get(pid)
+            if i is None:
+                self._send(404, {"error": "Paper not found"})
+                return
+            neighbors = graph.references[i] if kind == "references" else graph.citations[i]
+            offset = int(params.get("offset", 0))
+            limit = int(params.get("limit", 100))
+            key = "citedPaper" if kind == "references" else "citingPaper"
+            page = neighbors[offset : offset + limit]
+            payload = {
+                "offset": offset,
+                "data": [{key: {"paperId": graph.ids[j]}} for j in page],
+            }
+            if offset + limit < len(neighbors):
+                payload["next"] = offset + limit
+            self._send(200, payload)
+            return
+
+        m = re.fullmatch(r"/graph/v1/paper/([^/]+)", url.path)
+        if m:
+            if self._throttle("paper"):
+                return
+            i = graph.index.get(m.group(1))
+            if i is None:
+                self._send(404, {"error": "Paper not found"})
+                return
+            self._send(200, graph.paper_json(i, fields, inline_limit))
+            return
+
+        self._send(404, {"error": f"Unknown endpoint {url.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        fields = [f for f in params.get("fields", "").split(",") if f]
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        graph = self.server.graph
+
+        if url.path == "/graph/v1/paper/batch":
+            if self._throttle("batch"):
+                return
+            ids = body.get("ids", [])
+            self.server.count("batch_ids", len(ids))
+            out = []
+            for pid in ids:
+                i = graph.lookup(pid)
+                out.append(
+                    None
+                    if i is None
+                    else graph.paper_json(i, fields, self.server.config["inline_limit"])
+                )
+            self._send(200, out)
+            return
+
+        self._send(404, {"error": f"Unknown endpoint {url.path}"})
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, graph, latency=0.0, rate_429=0.0, inline_limit=1000):
+        super().__init__(address, MockHandler)
+        self.graph = graph
+        self.config = {"latency": latency, "rate_429": rate_429, "inline_limit": inline_limit}
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+            if key not in ("bytes", "batch_ids", "429", "connections"):
+                self.stats["requests"] += n
+
+
+def dump_dataset(graph, out_dir, files=4):
+    """Write the graph as papers/ and citations/ files of a bulk dataset dump."""
+    n = len(graph.ids)
+    for name in ("papers", "citations"):
+        os.makedirs(os.path.join(out_dir, name), exist_ok=True)
+    for part in range(files):
+        chunk = range(part * n // files, (part + 1) * n // files)
+        with gzip.open(os.path.join(out_dir, "papers", f"part{part}.jsonl.gz"), "wt") as f:
+            for i in chunk:
+                record = {
+                    "corpusid": i,
+                    "externalids": {"DOI": f"10.5555/mock.{i}", "CorpusId": str(i)},
+                    "url": f"https://www.semanticscholar.org/paper/{graph.ids[i]}",
+                    "title": graph.titles[i],
+                    "year": graph.years[i],
+                }
+                f.write(json.dumps(record) + "\n")
+        with gzip.open(os.path.join(out_dir, "citations", f"part{part}.jsonl.gz"), "wt") as f:
+            for i in chunk:
+                for j in graph.references[i]:
+                    f.write(json.dumps({"citingcorpusid": i, "citedcorpusid": j}) + "\n")
+    print(f"Dataset dump of {n} papers written to {out_dir}/")
+
+
+def serve(args, ready=None):
+    """Build the graph and serve forever; `ready` (an Event) is set once listening."""
+    graph = SyntheticGraph(args.papers, args.mean_degree, args.degree_dist, args.seed)
+    server = MockServer(
+        (args.host, args.port), graph, args.latency, args.rate_429, args.inline_limit
+    )
+    print(f"Mock Semantic Scholar API on http://{args.host}:{args.port} ({args.papers} papers)")
+    if ready is not None:
+        ready.set()
+    server.serve_forever()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--papers", type=int, default=10000, help="papers in the synthetic graph")
+    parser.add_argument("--mean-degree", type=float, default=10, help="mean references per paper")
+    parser.add_argument(
+        "--degree-dist",
+        choices=["fixed", "uniform", "lognormal", "powerlaw"],
+        default="lognormal",
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds per request")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--inline-limit", type=int, default=1000, help="cap on inline references/citations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dump-dataset", metavar="DIR", help="write the graph as a bulk dataset dump and exit")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    if args.dump_dataset:
+        dump_dataset(SyntheticGraph(args.papers, args.mean_degree, args.degree_dist, args.seed), args.dump_dataset)
+    else:
+        serve(args)
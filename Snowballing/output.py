@@ -0,0 +1,100 @@
+"""
+Streaming columnar output for snowballing results.
+
+Every flush of new records is written as its own small Parquet part file,
+which survives crashes and resumes. At the end the parts are streamed
+into a single Parquet file (Parquet is the primary output, so readers can
+load only the columns they need, e.g. pd.read_parquet(path,
+columns=["PaperId", "DOI"])) and, optionally, into an Excel file written
+row by row through openpyxl's write-only mode. Nothing is ever loaded
+into memory as a whole.
+"""
+
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+OUTPUT_SCHEMA = pa.schema(
+    [
+        ("PaperId", pa.string()),
+        ("Title", pa.string()),
+        ("DOI", pa.string()),
+        ("Direction", pa.string()),
+        ("IsBackward", pa.int8()),
+        ("IsForward", pa.int8()),
+        ("SourceCount", pa.int32()),
+        ("SourcePapers", pa.string()),
+        ("Round", pa.int16()),
+    ]
+)
+OUTPUT_COLUMNS = OUTPUT_SCHEMA.names
+# incremental runs (deltastore.py) tag each row with the run that found it
+DELTA_SCHEMA = OUTPUT_SCHEMA.append(pa.field("Delta", pa.string()))
+
+ROW_GROUP_SIZE = 65536  # target rows per row group in the merged file
+
+
+def write_part(records, parts_dir, name, schema=OUTPUT_SCHEMA):
+    """Write `records` (list of dicts) as `parts_dir/name.parquet`, atomically.
+
+    Re-writing a part with the same name replaces it, so a flush repeated
+    after a crash does not duplicate rows.
+    """
+    os.makedirs(parts_dir, exist_ok=True)
+    path = os.path.join(parts_dir, f"{name}.parquet")
+    tmp_path = path + ".tmp"
+    pq.write_table(pa.Table.from_pylist(records, schema=schema), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _part_paths(parts_dir):
+    if not os.path.isdir(parts_dir):
+        return []
+    return sorted(
+        os.path.join(parts_dir, name)
+        for name in os.listdir(parts_dir)
+        if name.endswith(".parquet")
+    )
+
+
+def merge_parts(parts_dir, output_path, schema=OUTPUT_SCHEMA):
+    """Stream all part files into one Parquet file; returns the row count."""
+    rows = 0
+    pending = []
+    pending_rows = 0
+    with pq.ParquetWriter(output_path, schema) as writer:
+        for path in _part_paths(parts_dir):
+            table = pq.read_table(path, schema=schema)
+            pending.append(table)
+            pending_rows += table.num_rows
+            if pending_rows >= ROW_GROUP_SIZE:
+                writer.write_table(pa.concat_tables(pending), row_group_size=ROW_GROUP_SIZE)
+                rows += pending_rows
+                pending, pending_rows = [], 0
+        if pending:
+            writer.write_table(pa.concat_tables(pending), row_group_size=ROW_GROUP_SIZE)
+            rows += pending_rows
+    return rows
+
+
+def export_excel(parquet_path, excel_path, batch_size=10000):
+    """Stream a Parquet file into a write-only openpyxl workbook."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    pf = pq.ParquetFile(parquet_path)
+    ws.append(pf.schema_arrow.names)
+    for batch in pf.iter_batches(batch_size=batch_size):
+        columns = [column.to_pylist() for column in batch.columns]
+        for row in zip(*columns):
+            ws.append(row)
+    wb.save(excel_path)
+
+
+def remove_parts(parts_dir):
+    if os.path.isdir(parts_dir):
+        shutil.rmtree(parts_dir)
@@ -0,0 +1,128 @@
+"""
+End-to-end pipeline: title list -> DOI/PaperId resolution (getDoi.py) ->
+snowballing with metadata enrichment (snowballing.py), in one process.
+
+Usage: python pipeline.py [--input ForSnowballing.xlsx] [--rounds N]
+
+The stages pass ids in memory instead of through papers_with_ids.xlsx, and
+share one Semantic Scholar client, token bucket, retry policy and response
+cache, so they draw on a single request budget. Files are only written at
+the sinks that are asked for: the snowball output (Parquet, plus Excel
+unless --no-excel) and, with --ids-output, the resolved ids.
+
+From Python:
+
+    import pipeline
+    new_ids, backward, forward = pipeline.run([("Some title", 2020), ...], rounds=2)
+
+Resolution is journaled as in getDoi.py and the crawl checkpointed as in
+snowballing.py, so an interrupted pipeline resumes where it stopped; the
+resolution journal is kept until the crawl has finished.
+"""
+
+import argparse
+
+import pandas as pd
+
+import getDoi
+import snowballing
+
+
+def share_client():
+    """Point getDoi.py at snowballing.py's client, rate limiter, retry policy and cache."""
+    getDoi.sch = snowballing.sch
+    getDoi.limiter = snowballing.limiter
+    getDoi.retry_policy = snowballing.retry_policy
+    if getDoi.cache is not None and getDoi.cache is not snowballing.cache:
+        getDoi.cache.close()
+    getDoi.cache = snowballing.cache
+
+
+def title_rows(titles):
+    """getDoi.py rows [(row, title, year, doi)] from (title, year[, doi]) tuples."""
+    rows = []
+    for idx, entry in enumerate(titles):
+        title, year, doi = (tuple(entry) + ("",))[:3]
+        year = int(year) if year is not None and pd.notna(year) else None
+        rows.append((idx, str(title).strip(), year, getDoi._clean_doi(doi)))
+    return rows
+
+
+def resolve(rows, ids_output=None):
+    """Resolved rows of getDoi.py for `rows`, in input order; also written to
+    `ids_output` (an Excel file) when given."""
+    results = getDoi.resolve_all(rows)
+    ordered = [results[idx] for idx, _, _, _ in rows]
+    print(getDoi.summarize(ordered))
+    if ids_output:
+        pd.DataFrame(ordered).to_excel(ids_output, index=False)
+        print(f"Saved: {ids_output}")
+    return ordered
+
+
+def seed_ids(results, min_confidence=0.0):
+    """PaperIds of the resolved rows with at least `min_confidence`."""
+    for result in results:
+        if result["PaperId"] and result["Confidence"] >= min_confidence:
+            yield result["PaperId"]
+
+
+def run(titles, rounds=1, ids_output=None, min_confidence=0.0, **snowball_args):
+    """Resolve `titles` ((title, year[, doi]) tuples) and snowball from them.
+
+    Keyword arguments are passed to snowballing.snowball(); returns its
+    result (None if the snowball output already exists).
+    """
+    share_client()
+    rows = title_rows(titles)
+    results = resolve(rows, ids_output)
+    result = snowballing.snowball(
+        seed_ids(results, min_confidence), rounds=rounds, source=f"{len(rows)} titles", **snowball_args
+    )
+    getDoi.clear_progress()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--input",
+        default=getDoi.INPUT_FILE,
+        help="Excel file with Title, Publication Year and optionally DOI columns (default: %(default)s)",
+    )
+    parser.add_argument("--rounds", type=int, default=1, help="number of snowballing rounds (default: 1)")
+    parser.add_argument(
+        "--ids-output",
+        help=f"also write the resolved ids to this Excel file (like {getDoi.OUTPUT_FILE})",
+    )
+    parser.add_argument(
+        "--min-confidence",
+        type=float,
+        default=0.0,
+        help="only snowball from titles resolved with at least this confidence (0-1)",
+    )
+    parser.add_argument(
+        "--no-excel",
+        action="store_true",
+        help=f"only write {snowballing.OUTPUT_FILE}, skip the Excel copy",
+    )
+    parser.add_argument(
+        "--dataset",
+        help="read neighbors and metadata from a local Semantic Scholar dataset dump (see snowballing.py)",
+    )
+    args = parser.parse_args()
+
+    print(f"Loading input file: {args.input}")
+    rows = getDoi.read_titles(args.input)
+    run(
+        [(title, year, doi) for _, title, year, doi in rows],
+        rounds=args.rounds,
+        ids_output=args.ids_output,
+        min_confidence=args.min_confidence,
+        excel_file=None if args.no_excel else snowballing.EXCEL_OUTPUT_FILE,
+        dataset_dir=args.dataset,
+    )
+
+
+if __name__ == "__main__":
+    main()
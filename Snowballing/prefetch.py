@@ -0,0 +1,98 @@
+"""
+Background metadata prefetching for snowballing.
+
+Newly discovered (interned) ids are queued as soon as they are found; a
+worker thread groups them into batches, fetches title/DOI and parks the
+results in a shared map. When a flush needs rows, take() only waits for
+whatever is still outstanding, so neighbor crawling and metadata
+enrichment overlap. A one-byte-per-id "requested" array guarantees each
+id is fetched at most once.
+"""
+
+import queue
+import threading
+import time
+
+
+class MetadataPrefetcher:
+    """Queue-fed background worker that batches metadata lookups."""
+
+    def __init__(self, fetch, decode_many, batch_size, linger=0.5):
+        """
+        fetch: callable(list of id strings) -> {id string: metadata dict}
+        decode_many: callable(list of dense ints) -> list of id strings
+        batch_size: ids per fetch call
+        linger: seconds to wait for a batch to fill unless someone is waiting
+        """
+        self._fetch = fetch
+        self._decode_many = decode_many
+        self.batch_size = batch_size
+        self.linger = linger
+        self._queue = queue.Queue()
+        self._requested = bytearray()
+        self._results = {}
+        self._cond = threading.Condition()
+        self._waiting = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metadata-prefetch", daemon=True)
+        self._thread.start()
+
+    def submit(self, indices):
+        """Queue ids for fetching; ids requested before are ignored."""
+        requested = self._requested
+        for idx in indices:
+            if idx >= len(requested):
+                requested.extend(bytes(idx + 1 - len(requested)))
+            if not requested[idx]:
+                requested[idx] = 1
+                self._queue.put(idx)
+
+    def take(self, indices):
+        """Block until metadata for `indices` is ready; returns and forgets it."""
+        self.submit(indices)
+        with self._cond:
+            self._waiting.set()
+            try:
+                self._cond.wait_for(lambda: all(i in self._results for i in indices))
+            finally:
+                self._waiting.clear()
+            return {i: self._results.pop(i) for i in indices}
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                try:
+                    if self._waiting.is_set():
+                        item = self._queue.get_nowait()
+                    else:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._fetch_batch(batch)
+            if stop:
+                return
+
+    def _fetch_batch(self, batch):
+        pids = self._decode_many(batch)
+        try:
+            meta = self._fetch(pids)
+        except Exception as e:
+            print(f"    Metadata prefetch failed for {len(batch)} ids: {e}")
+            meta = {}
+        with self._cond:
+            for idx, pid in zip(batch, pids):
+                self._results[idx] = meta.get(pid, {})
+            self._cond.notify_all()
@@ -0,0 +1,77 @@
+"""
+Relevance ranking of snowballing candidates.
+
+At the end of each round the papers discovered in it are scored with
+graph signals computed over every edge crawled so far (graphstore.py):
+
+  sources      crawled papers the candidate is linked to
+  coupling     references the candidate shares with the seeds
+  cocitation   papers citing both the candidate and a seed
+  pagerank     personalized PageRank restarting at the seeds
+
+Each signal is scaled to [0, 1] by its maximum over the candidates and
+the weighted sum is the score. Everything is a NumPy bincount over the
+edge arrays, so ranking a round costs milliseconds even for millions of
+edges. select() then keeps the top-K and/or above-threshold candidates
+for expansion in the next round.
+"""
+
+import numpy as np
+
+SIGNALS = ("sources", "coupling", "cocitation", "pagerank")
+DEFAULT_WEIGHTS = {"sources": 0.25, "coupling": 0.25, "cocitation": 0.25, "pagerank": 0.25}
+
+
+def personalized_pagerank(citing, cited, n, seeds, alpha=0.15, iterations=30):
+    """PageRank over the undirected edge set, restarting at `seeds` with
+    probability `alpha`."""
+    src = np.concatenate([citing, cited])
+    dst = np.concatenate([cited, citing])
+    degree = np.bincount(src, minlength=n).astype(np.float64)
+    restart = np.zeros(n)
+    restart[seeds] = 1.0 / max(len(seeds), 1)
+    rank = restart.copy()
+    inv_degree = np.divide(1.0, degree, out=np.zeros(n), where=degree > 0)
+    for _ in range(iterations):
+        spread = np.bincount(dst, weights=(rank * inv_degree)[src], minlength=n)
+        dangling = rank[degree == 0].sum()
+        rank = alpha * restart + (1 - alpha) * (spread + dangling * restart)
+    return rank
+
+
+def score_candidates(citing, cited, n, seeds, candidates, weights=None):
+    """Score `candidates` (dense ids) against `seeds` over the (citing, cited)
+    edge arrays of an n-node graph. Returns ({signal: array}, score array)."""
+    weights = weights or DEFAULT_WEIGHTS
+    is_seed = np.zeros(n)
+    is_seed[seeds] = 1.0
+    seeds_cited_by = np.bincount(citing, weights=is_seed[cited], minlength=n)
+    seed_citers_of = np.bincount(cited, weights=is_seed[citing], minlength=n)
+    signals = {
+        "sources": np.bincount(citing, minlength=n) + np.bincount(cited, minlength=n),
+        "coupling": np.bincount(citing, weights=seed_citers_of[cited], minlength=n),
+        "cocitation": np.bincount(cited, weights=seeds_cited_by[citing], minlength=n),
+        "pagerank": personalized_pagerank(citing, cited, n, seeds),
+    }
+    candidates = np.asarray(candidates, dtype=np.int64)
+    score = np.zeros(len(candidates))
+    out = {}
+    for name in SIGNALS:
+        values = signals[name][candidates].astype(np.float64)
+        out[name] = values
+        top = values.max() if len(values) else 0.0
+        if top > 0:
+            score += weights.get(name, 0.0) * values / top
+    return out, score
+
+
+def select(score, top_k=None, min_score=None):
+    """Boolean mask of the candidates to expand (all of them by default)."""
+    keep = np.ones(len(score), dtype=bool)
+    if min_score is not None:
+        keep &= score >= min_score
+    if top_k is not None and keep.sum() > top_k:
+        order = np.argsort(-np.where(keep, score, -np.inf), kind="stable")
+        keep[:] = False
+        keep[order[:top_k]] = True
+    return keep
@@ -0,0 +1,70 @@
+"""
+Shared rate limiting for Semantic Scholar calls.
+
+A single TokenBucket instance is shared by every worker thread so the
+whole process stays under one global requests-per-second budget. The
+budget adapts: backoff() cuts it (and can pause every caller) when the
+API throttles us, recover() raises it back step by step after successes.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+
+    The configured rate is also the ceiling for recover(); backoff() never
+    goes below `min_rate` (default: a sixteenth of the configured rate).
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.max_rate = self.rate
+        self.min_rate = float(min_rate) if min_rate else self.rate / 16
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self, tokens=1.0):
+        """Block until `tokens` are available, then consume them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens and now >= self._updated:
+                    self._tokens -= tokens
+                    return
+                # _updated lies in the future while the bucket is paused
+                wait = max(0.0, self._updated - now) + max(0.0, tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def backoff(self, factor=0.5, pause=0.0):
+        """Multiply the rate by `factor` (not below min_rate) and, if `pause`
+        is given, hold every caller for that many seconds. Returns the new rate."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * factor)
+            if pause > 0:
+                self._tokens = 0.0
+                self._updated = max(self._updated, now + pause)
+            return self.rate
+
+    def recover(self, step=None):
+        """Raise the rate by `step` (default: a twentieth of the configured
+        rate) up to the configured rate. Returns the new rate."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + (step or self.max_rate / 20))
+            return self.rate
@@ -0,0 +1,139 @@
+"""
+Persistent on-disk cache for Semantic Scholar responses.
+
+Entries are keyed by (endpoint, paper id / query, requested fields) and
+stored as JSON in a local SQLite file, so reruns and partial reruns of
+snowballing.py / getDoi.py reuse everything fetched within the TTL.
+Entries older than `ttl` seconds are ignored and purged; when the cache
+grows beyond `max_bytes` the least recently used entries are evicted.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+_MISSING = object()
+
+
+class ResponseCache:
+    """Thread-safe SQLite-backed key/value cache with TTL and size eviction."""
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_bytes=1024**3, check_every=500):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.check_every = check_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)  # shared by shard processes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(endpoint, ident, fields=None):
+        """Build a cache key from endpoint, id/query and the requested fields."""
+        field_part = ",".join(sorted(fields)) if fields else ""
+        return f"{endpoint}|{ident}|{field_part}"
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return default
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return default
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return json.loads(value)
+
+    def set(self, key, value):
+        self.set_many([(key, value)])
+
+    def set_many(self, items):
+        """Store several (key, value) pairs in one transaction."""
+        now = time.time()
+        rows = []
+        for key, value in items:
+            payload = json.dumps(value, separators=(",", ":"))
+            rows.append((key, payload, len(payload), now, now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            before = self._writes // self.check_every
+            self._writes += len(rows)
+            if self._writes // self.check_every != before:
+                self._evict_locked()
+
+    def get_or_fetch(self, key, fetch):
+        """Return the cached value for `key`, or call `fetch()` and cache its result.
+
+        Exceptions from `fetch` propagate and nothing is cached, so failed
+        requests are retried on the next run.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = fetch()
+        self.set(key, value)
+        return value
+
+    def evict(self):
+        """Purge expired entries and trim the cache to `max_bytes`."""
+        with self._lock:
+            self._evict_locked()
+
+    def _evict_locked(self):
+        if self.ttl is not None:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+            )
+        if self.max_bytes is not None:
+            (total,) = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            if total > self.max_bytes:
+                # Trim to 90% so eviction does not run on every write.
+                excess = total - int(self.max_bytes * 0.9)
+                cursor = self._conn.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed ASC"
+                )
+                victims = []
+                for key, size in cursor:
+                    victims.append((key,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,370 @@
+"""
+Local Semantic Scholar dataset dump as a neighbor and metadata source.
+
+A bulk download of the Datasets API is a directory of JSON-lines files,
+usually gzipped:
+
+  <dataset>/papers/*     {"corpusid", "url" or "paperId", "title", "externalids", ...}
+  <dataset>/citations/*  {"citingcorpusid", "citedcorpusid", ...}
+
+build_index() streams both once and writes an index directory that later
+runs reuse as long as the dump files are unchanged (manifest.json):
+
+  corpus.npy                  int64[n]  corpus id of node i (sorted)
+  ids.npy                     S40[n]    paper id of node i; "CorpusId:N" for
+                                        papers missing from papers/
+  ids_sorted.npy, ids_order.npy         paper ids sorted, and their nodes
+  references/, citations/     CSR offsets.npy + neighbors.npy (graphstore.py)
+  meta.sqlite                 title and DOI per corpus id
+
+Citation edges never have to fit in RAM: they are spilled to disk in
+chunks of EDGE_CHUNK, then split into node-range buckets of about
+EDGE_CHUNK edges, and each bucket is sorted, deduplicated and appended to
+the CSR arrays on its own. Memory grows with the number of papers, not
+with the number of citations.
+
+LocalDataset memory-maps the arrays, so a batch of lookups is a few NumPy
+searches and slices instead of rate-limited API calls.
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+import numpy as np
+
+from graphstore import EDGE_DTYPE, CitationGraph, save_arrays
+
+INDEX_FORMAT = 1
+ID_WIDTH = 40  # Semantic Scholar paper ids are 40 hex characters
+PROGRESS_EVERY = 1_000_000  # records between progress lines while indexing
+META_CHUNK = 50_000
+EDGE_CHUNK = 10_000_000  # citation edges held in memory at a time while indexing
+OPEN_BUCKETS = 256  # bucket files written per scan of the edges
+
+
+def _dump_files(dataset_dir, name):
+    folder = os.path.join(dataset_dir, name)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        os.path.join(folder, f)
+        for f in os.listdir(folder)
+        if not f.startswith(".") and os.path.isfile(os.path.join(folder, f))
+    )
+
+
+def _records(path):
+    """Parsed JSON lines of one dump file (gzipped or plain)."""
+    with open(path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    opener = gzip.open if gzipped else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _paper_fields(rec):
+    """(corpus id, paper id, title, DOI) of a papers record."""
+    ext = rec.get("externalids") or rec.get("externalIds") or {}
+    corpus = rec.get("corpusid") or rec.get("corpusId") or ext.get("CorpusId")
+    pid = rec.get("paperId") or rec.get("paperid") or ""
+    url = rec.get("url") or ""
+    if not pid and "/paper/" in url:
+        pid = url.rstrip("/").rsplit("/", 1)[-1]
+    return corpus, pid, rec.get("title") or "", ext.get("DOI") or ""
+
+
+def _manifest(dataset_dir):
+    files = _dump_files(dataset_dir, "papers") + _dump_files(dataset_dir, "citations")
+    return {
+        "format": INDEX_FORMAT,
+        "files": [[os.path.relpath(p, dataset_dir), os.path.getsize(p), os.stat(p).st_mtime_ns] for p in files],
+    }
+
+
+def index_is_current(dataset_dir, index_dir):
+    path = os.path.join(index_dir, "manifest.json")
+    if not os.path.exists(path):
+        return False
+    with open(path, encoding="utf-8") as f:
+        return json.load(f) == _manifest(dataset_dir)
+
+
+def _spill_edges(dataset_dir, raw_path):
+    """Write the dump's (citing, cited) corpus ids to `raw_path` as int64
+    pairs, EDGE_CHUNK at a time; returns (edges, sorted corpus ids seen)."""
+    seen = np.empty(0, dtype=np.int64)
+    pairs = array("q")
+    edges = 0
+    with open(raw_path, "wb") as out:
+
+        def spill():
+            nonlocal seen, pairs
+            chunk = np.frombuffer(pairs, dtype=np.int64)
+            seen = np.union1d(seen, chunk)
+            chunk.tofile(out)
+            pairs = array("q")
+
+        for path in _dump_files(dataset_dir, "citations"):
+            for rec in _records(path):
+                src, dst = rec.get("citingcorpusid"), rec.get("citedcorpusid")
+                if src is None or dst is None:
+                    continue  # citations of papers outside the corpus
+                pairs.append(int(src))
+                pairs.append(int(dst))
+                edges += 1
+                if edges % EDGE_CHUNK == 0:
+                    spill()
+                if edges % PROGRESS_EVERY == 0:
+                    print(f"    Indexed {edges} citations...")
+        spill()
+    return edges, seen
+
+
+def _map_edges(raw_path, edge_path, corpus):
+    """Rewrite the corpus-id pairs of `raw_path` as node pairs (EDGE_DTYPE)
+    in `edge_path`; returns the (out, in) degree of every node, duplicates
+    included."""
+    n = len(corpus)
+    out_degree = np.zeros(n, dtype=np.int64)
+    in_degree = np.zeros(n, dtype=np.int64)
+    raw = np.memmap(raw_path, dtype=np.int64, mode="r") if os.path.getsize(raw_path) else np.empty(0, np.int64)
+    with open(edge_path, "wb") as out:
+        for start in range(0, len(raw), 2 * EDGE_CHUNK):
+            chunk = np.searchsorted(corpus, raw[start : start + 2 * EDGE_CHUNK]).astype(EDGE_DTYPE)
+            out_degree += np.bincount(chunk[0::2], minlength=n)
+            in_degree += np.bincount(chunk[1::2], minlength=n)
+            chunk.tofile(out)
+    del raw
+    return out_degree, in_degree
+
+
+def _write_csr(edge_path, degree, by_cited, directory, tmp_dir):
+    """CSR offsets.npy + neighbors.npy in `directory` for the node pairs in
+    `edge_path`, keyed by the citing node (or the cited one if `by_cited`),
+    deduplicated; returns the number of edges written."""
+    n = len(degree)
+    key_col, other_col = (1, 0) if by_cited else (0, 1)
+    # node ranges holding about EDGE_CHUNK edges each (a node is never split)
+    ends = np.searchsorted(np.cumsum(degree), np.arange(EDGE_CHUNK, degree.sum(), EDGE_CHUNK), side="right")
+    bounds = np.unique(np.concatenate([[0], ends, [n]]))
+    bucket_paths = [os.path.join(tmp_dir, f"bucket{b}.bin") for b in range(len(bounds) - 1)]
+    edges = np.memmap(edge_path, dtype=EDGE_DTYPE, mode="r") if os.path.getsize(edge_path) else np.empty(0, EDGE_DTYPE)
+    # one scan of the edges per OPEN_BUCKETS buckets, to bound open files
+    for first in range(0, len(bucket_paths), OPEN_BUCKETS):
+        group = range(first, min(first + OPEN_BUCKETS, len(bucket_paths)))
+        lo, hi = bounds[group.start], bounds[group.stop]
+        files = [open(bucket_paths[b], "wb") for b in group]
+        try:
+            for start in range(0, len(edges), 2 * EDGE_CHUNK):
+                chunk = np.asarray(edges[start : start + 2 * EDGE_CHUNK]).reshape(-1, 2)
+                chunk = chunk[(chunk[:, key_col] >= lo) & (chunk[:, key_col] < hi)][:, [key_col, other_col]]
+                which = np.searchsorted(bounds, chunk[:, 0], side="right") - 1 - group.start
+                order = np.argsort(which, kind="stable")
+                chunk, which = chunk[order], which[order]
+                cuts = np.searchsorted(which, np.arange(len(files) + 1))
+                for b, f in enumerate(files):
+                    if cuts[b] < cuts[b + 1]:
+                        chunk[cuts[b] : cuts[b + 1]].tofile(f)
+        finally:
+            for f in files:
+                f.close()
+    del edges
+
+    counts = np.zeros(n, dtype=np.int64)
+    neighbors_path = os.path.join(tmp_dir, "neighbors.bin")
+    total = 0
+    with open(neighbors_path, "wb") as out:
+        for b, path in enumerate(bucket_paths):
+            pairs = np.fromfile(path, dtype=EDGE_DTYPE).reshape(-1, 2)
+            os.remove(path)
+            keys = np.unique(pairs[:, 0].astype(np.int64) * n + pairs[:, 1])
+            del pairs
+            lo = bounds[b]
+            counts[lo : bounds[b + 1]] = np.bincount(keys // n - lo, minlength=bounds[b + 1] - lo)
+            (keys % n).astype(EDGE_DTYPE).tofile(out)
+            total += len(keys)
+
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    save_arrays(directory, {"offsets": offsets})
+    # copy into a .npy file chunk by chunk, replacing the old one atomically
+    tmp_path = os.path.join(directory, "neighbors.tmp.npy")
+    neighbors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=EDGE_DTYPE, shape=(total,))
+    with open(neighbors_path, "rb") as f:
+        for start in range(0, total, EDGE_CHUNK):
+            block = np.fromfile(f, dtype=EDGE_DTYPE, count=min(EDGE_CHUNK, total - start))
+            neighbors[start : start + len(block)] = block
+    neighbors.flush()
+    del neighbors
+    os.replace(tmp_path, os.path.join(directory, "neighbors.npy"))
+    os.remove(neighbors_path)
+    return total
+
+
+def build_index(dataset_dir, index_dir):
+    """Stream the dump once and write the index; returns (papers, edges)."""
+    manifest = _manifest(dataset_dir)
+    if not manifest["files"]:
+        raise FileNotFoundError(f"no papers/ or citations/ files in {dataset_dir}")
+    os.makedirs(index_dir, exist_ok=True)
+    manifest_path = os.path.join(index_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)  # the index is incomplete until rewritten
+    started = time.time()
+
+    meta_path = os.path.join(index_dir, "meta.sqlite")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    conn = sqlite3.connect(meta_path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        "CREATE TABLE meta (corpusid INTEGER PRIMARY KEY, pid TEXT, title TEXT, doi TEXT)"
+    )
+    paper_corpus = array("q")
+    rows = []
+    for path in _dump_files(dataset_dir, "papers"):
+        for rec in _records(path):
+            corpus, pid, title, doi = _paper_fields(rec)
+            if corpus is None:
+                continue
+            paper_corpus.append(int(corpus))
+            rows.append((int(corpus), pid if 0 < len(pid) <= ID_WIDTH else None, title, doi))
+            if len(rows) >= META_CHUNK:
+                conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?)", rows)
+                rows = []
+            if len(paper_corpus) % PROGRESS_EVERY == 0:
+                print(f"    Indexed {len(paper_corpus)} papers...")
+    conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+
+    tmp_dir = os.path.join(index_dir, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    raw_path = os.path.join(tmp_dir, "citations.bin")
+    edge_path = os.path.join(tmp_dir, "edges.bin")
+    _, seen = _spill_edges(dataset_dir, raw_path)
+    corpus = np.union1d(np.frombuffer(paper_corpus, dtype=np.int64), seen)
+    del paper_corpus, seen
+    n = len(corpus)
+
+    ids = np.char.add(b"CorpusId:", corpus.astype("S20")).astype(f"S{ID_WIDTH}")
+    known = conn.execute("SELECT corpusid, pid FROM meta WHERE pid IS NOT NULL ORDER BY corpusid")
+    while True:
+        chunk = known.fetchmany(META_CHUNK)
+        if not chunk:
+            break
+        ids[np.searchsorted(corpus, [c for c, _ in chunk])] = [pid.encode() for _, pid in chunk]
+    conn.close()
+    order = np.argsort(ids, kind="stable").astype(np.int64)
+    save_arrays(index_dir, {"corpus": corpus, "ids": ids, "ids_sorted": ids[order], "ids_order": order})
+    del ids, order
+
+    out_degree, in_degree = _map_edges(raw_path, edge_path, corpus)
+    os.remove(raw_path)
+    edges = _write_csr(edge_path, out_degree, False, os.path.join(index_dir, "references"), tmp_dir)
+    _write_csr(edge_path, in_degree, True, os.path.join(index_dir, "citations"), tmp_dir)
+    os.remove(edge_path)
+    os.rmdir(tmp_dir)
+
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    print(f"  [Saved] {index_dir}/ ({n} papers, {edges} citations, {time.time() - started:.0f}s)")
+    return n, edges
+
+
+class LocalDataset:
+    """Read-only view of an index written by build_index(); thread-safe."""
+
+    def __init__(self, index_dir):
+        def load(*parts):
+            return np.load(os.path.join(index_dir, *parts) + ".npy", mmap_mode="r")
+
+        self.corpus = load("corpus")
+        self.ids = load("ids")
+        self._ids_sorted = load("ids_sorted")
+        self._ids_order = load("ids_order")
+        self.references = CitationGraph(load("references", "offsets"), load("references", "neighbors"), self.ids)
+        self.citations = CitationGraph(load("citations", "offsets"), load("citations", "neighbors"), self.ids)
+        self._conn = sqlite3.connect(os.path.join(index_dir, "meta.sqlite"), check_same_thread=False)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, dataset_dir, index_dir):
+        """Open the index of `dataset_dir`, (re)building it if the dump changed."""
+        if index_is_current(dataset_dir, index_dir):
+            print(f"  Using dataset index {index_dir}/")
+        else:
+            print(f"  Indexing dataset {dataset_dir} into {index_dir}/ ...")
+            build_index(dataset_dir, index_dir)
+        return cls(index_dir)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nodes(self, pids):
+        """Node of each paper id (-1 if absent); "CorpusId:N" ids also match."""
+        keys = np.array([pid.encode() for pid in pids], dtype=bytes)
+        if not len(keys) or not len(self):
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._ids_sorted, keys), len(self) - 1)
+        found = self._ids_sorted[pos] == keys
+        nodes = np.where(found, self._ids_order[pos], -1)
+        for i in np.flatnonzero(~found):
+            if pids[i].startswith("CorpusId:") and pids[i][9:].isdigit():
+                c = int(pids[i][9:])
+                j = np.searchsorted(self.corpus, c)
+                if j < len(self) and self.corpus[j] == c:
+                    nodes[i] = j
+        return nodes
+
+    def _paper_ids(self, nodes, limit):
+        return [pid.decode() for pid in self.ids[nodes[:limit]]]
+
+    def neighbors(self, pids, limit=None):
+        """{pid: (reference ids, citation ids)} for the papers in the dump."""
+        result = {}
+        for pid, node in zip(pids, self.nodes(pids)):
+            if node >= 0:
+                result[pid] = (
+                    self._paper_ids(self.references.references(node), limit),
+                    self._paper_ids(self.citations.references(node), limit),
+                )
+        return result
+
+    def counts(self, pids):
+        """{pid: (references, citations)} for the papers in the dump."""
+        refs, cits = self.references.offsets, self.citations.offsets
+        return {
+            pid: (int(refs[node + 1] - refs[node]), int(cits[node + 1] - cits[node]))
+            for pid, node in zip(pids, self.nodes(pids))
+            if node >= 0
+        }
+
+    def metadata(self, pids):
+        """{pid: {"Title", "DOI"}} for the papers listed in papers/."""
+        by_corpus = {}
+        for pid, node in zip(pids, self.nodes(pids)):
+            if node >= 0:
+                by_corpus[int(self.corpus[node])] = pid
+        meta = {}
+        keys = list(by_corpus)
+        with self._lock:
+            for start in range(0, len(keys), 900):  # SQLite's bound-parameter limit
+                chunk = keys[start : start + 900]
+                rows = self._conn.execute(
+                    f"SELECT corpusid, title, doi FROM meta WHERE corpusid IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for corpus, title, doi in rows:
+                    meta[by_corpus[corpus]] = {"Title": title or "", "DOI": doi or ""}
+        return meta
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,191 @@
+"""
+Pooled HTTP transport for the Semantic Scholar clients.
+
+The client library opens a new httpx client, and so a new TCP/TLS
+connection, for every request. make_client() and make_async_client()
+return library clients whose requests go through one shared, pooled
+keep-alive session instead:
+
+  - up to POOL_SIZE connections kept alive for KEEPALIVE_EXPIRY seconds,
+    shared by every client with the same API key in the process
+  - HTTP/2 when HTTP2 is set and the optional h2 package is installed
+  - gzip-compressed responses
+  - separate connect and read timeouts
+  - the x-api-key header (S2_API_KEY by default)
+
+Responses are mapped to the library's exceptions as before. Those
+exceptions carry the HTTP response, so s2retry.py can read Retry-After.
+Status codes the library ignored (e.g. 502, 503) now raise
+httpx.HTTPStatusError instead of returning an empty result.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+from semanticscholar import AsyncSemanticScholar, SemanticScholar
+from semanticscholar.ApiRequester import ApiRequester
+from semanticscholar.SemanticScholarException import (
+    BadQueryParametersException,
+    GatewayTimeoutException,
+    InternalServerErrorException,
+    ObjectNotFoundException,
+)
+
+API_KEY = os.environ.get("S2_API_KEY")
+POOL_SIZE = 16  # keep >= the number of threads issuing requests
+KEEPALIVE_EXPIRY = 60.0  # seconds an idle connection is kept open
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 30.0
+HTTP2 = False  # needs the h2 package (pip install httpx[http2])
+
+_lock = threading.Lock()
+_sessions = {}  # api key -> httpx.Client
+_async_sessions = weakref.WeakKeyDictionary()  # event loop -> {api key: httpx.AsyncClient}
+
+
+def _http2():
+    if not HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("  h2 is not installed; using HTTP/1.1 (pip install httpx[http2])")
+        return False
+    return True
+
+
+def _session_args(api_key):
+    headers = {"Accept-Encoding": "gzip"}
+    if api_key:
+        headers["x-api-key"] = api_key
+    return {
+        "headers": headers,
+        "http2": _http2(),
+        "timeout": httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=POOL_SIZE,
+            max_keepalive_connections=POOL_SIZE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def session(api_key=API_KEY):
+    """The shared pooled httpx.Client for `api_key`, created on first use."""
+    with _lock:
+        client = _sessions.get(api_key)
+        if client is None or client.is_closed:
+            client = _sessions[api_key] = httpx.Client(**_session_args(api_key))
+        return client
+
+
+def async_session(api_key=API_KEY):
+    """The pooled httpx.AsyncClient for `api_key` on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_sessions.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None or client.is_closed:
+            client = clients[api_key] = httpx.AsyncClient(**_session_args(api_key))
+        return client
+
+
+def close():
+    """Close the shared sync sessions (async ones close with their event loop)."""
+    with _lock:
+        for client in _sessions.values():
+            client.close()
+        _sessions.clear()
+
+
+def _error(r):
+    try:
+        data = r.json()
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        return data.get("error") or data.get("message") or r.text
+    return r.text
+
+
+def _result(r):
+    """Response data, or the library's exception for the status code."""
+    if r.status_code == 200:
+        data = r.json()
+        if len(data) == 1 and "error" in data:
+            data = {}
+        return data
+    if r.status_code == 400:
+        exc = BadQueryParametersException(_error(r))
+    elif r.status_code == 403:
+        exc = PermissionError("HTTP status 403 Forbidden.")
+    elif r.status_code == 404:
+        exc = ObjectNotFoundException(_error(r))
+    elif r.status_code == 429:
+        exc = ConnectionRefusedError("HTTP status 429 Too Many Requests.")
+    elif r.status_code == 500:
+        exc = InternalServerErrorException(_error(r))
+    elif r.status_code == 504:
+        exc = GatewayTimeoutException(_error(r))
+    else:
+        r.raise_for_status()
+        return {}
+    exc.response = r
+    raise exc
+
+
+def _request_args(url, parameters, headers, payload):
+    return {
+        "method": "POST" if payload else "GET",
+        "url": url,
+        "params": parameters.lstrip("&"),
+        "headers": headers,
+        "json": payload,
+    }
+
+
+class PooledRequester(ApiRequester):
+    """ApiRequester sending every request through the shared sync session.
+
+    The library drives each sync call through a fresh event loop, so the
+    blocking request here is safe and the session outlives the call.
+    """
+
+    def __init__(self, api_key, timeout, retry=False):
+        super().__init__(timeout, retry)
+        self.api_key = api_key
+
+    async def get_data_async(self, url, parameters, headers, payload=None):
+        r = session(self.api_key).request(
+            **_request_args(url, parameters, headers, payload),
+            timeout=httpx.Timeout(self.timeout, connect=CONNECT_TIMEOUT),
+        )
+        return _result(r)
+
+
+class AsyncPooledRequester(PooledRequester):
+    """ApiRequester using the running event loop's pooled async session."""
+
+    async def get_data_async(self, url, parameters, headers, payload=None):
+        r = await async_session(self.api_key).request(
+            **_request_args(url, parameters, headers, payload),
+            timeout=httpx.Timeout(self.timeout, connect=CONNECT_TIMEOUT),
+        )
+        return _result(r)
+
+
+def make_async_client(api_url=None, api_key=API_KEY, timeout=READ_TIMEOUT):
+    """AsyncSemanticScholar on the pooled async session (retries off, see s2retry.py)."""
+    client = AsyncSemanticScholar(timeout=timeout, api_url=api_url, retry=False)
+    client._requester = AsyncPooledRequester(api_key, timeout)
+    return client
+
+
+def make_client(api_url=None, api_key=API_KEY, timeout=READ_TIMEOUT):
+    """SemanticScholar on the pooled sync session (retries off, see s2retry.py)."""
+    client = SemanticScholar(timeout=timeout, api_url=api_url, retry=False)
+    client._AsyncSemanticScholar._requester = PooledRequester(api_key, timeout)
+    return client
@@ -0,0 +1,165 @@
+"""
+Shared retry policy for Semantic Scholar calls.
+
+Every request goes through RetryPolicy.call(), which classifies failures:
+
+  throttled  (HTTP 429)                 -> lower the shared TokenBucket rate,
+                                           honor Retry-After, retry
+  transient  (5xx, timeouts, network)   -> exponential backoff with jitter, retry
+  permanent  (404, 400, 403, anything else) -> raise at once
+
+Successful calls let the rate climb back to its configured value. The
+client library's own retry loop is disabled (retry=False) so that every
+attempt is paced by the shared limiter.
+
+CircuitBreaker keeps optional extra work (such as the get_paper fallback)
+from running while the API is throttling or that path keeps failing.
+"""
+
+import random
+import threading
+import time
+
+import httpx
+from semanticscholar.SemanticScholarException import (
+    GatewayTimeoutException,
+    InternalServerErrorException,
+    ObjectNotFoundException,
+)
+
+THROTTLED = "throttled"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+
+def _unwrap(exc):
+    # With retry=False the client library still wraps the last failure in a
+    # tenacity RetryError.
+    last_attempt = getattr(exc, "last_attempt", None)
+    if last_attempt is not None and last_attempt.exception() is not None:
+        return last_attempt.exception()
+    return exc
+
+
+def _status(exc):
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) or getattr(exc, "status_code", None)
+
+
+def classify(exc):
+    """THROTTLED, TRANSIENT or PERMANENT for an exception raised by a request."""
+    exc = _unwrap(exc)
+    status = _status(exc)
+    if status == 429 or isinstance(exc, ConnectionRefusedError):
+        return THROTTLED
+    if (status is not None and status >= 500) or isinstance(
+        exc,
+        (
+            InternalServerErrorException,
+            GatewayTimeoutException,
+            httpx.TransportError,
+            ConnectionError,
+            TimeoutError,
+        ),
+    ):
+        return TRANSIENT
+    return PERMANENT
+
+
+def is_not_found(exc):
+    """True if a request failed because the object does not exist (HTTP 404)."""
+    exc = _unwrap(exc)
+    return isinstance(exc, ObjectNotFoundException) or _status(exc) == 404
+
+
+def retry_after(exc):
+    """Seconds from a Retry-After header (or attribute) on the exception, if any."""
+    exc = _unwrap(exc)
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        value = headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None  # HTTP-date form; fall back to our own backoff
+
+
+class RetryPolicy:
+    """Retry with classified errors, jittered backoff and an adaptive rate."""
+
+    def __init__(self, limiter, attempts=6, base_delay=2.0, max_delay=60.0, on_error=None):
+        """
+        limiter: shared TokenBucket whose rate is lowered while throttled
+        attempts: total tries per call
+        base_delay / max_delay: backoff is uniform in [0, min(max_delay, base_delay * 2**n)]
+        on_error: optional callable(kind, exc, wait) run for every failed attempt;
+            wait is None when the error is raised instead of retried
+        """
+        self.limiter = limiter
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_error = on_error
+
+    def backoff_delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def call(self, fn):
+        """Run fn() (which must acquire the limiter itself) until it succeeds."""
+        for attempt in range(self.attempts):
+            try:
+                result = fn()
+            except Exception as e:
+                kind = classify(e)
+                last = kind == PERMANENT or attempt == self.attempts - 1
+                wait = None
+                if kind == THROTTLED:
+                    hint = retry_after(e)
+                    rate = self.limiter.backoff(pause=hint or 0.0)
+                    if not last:
+                        wait = hint if hint is not None else self.backoff_delay(attempt)
+                        print(f"    Throttled; rate lowered to {rate:.2f} req/s, retrying in {wait:.1f}s")
+                elif not last:
+                    wait = self.backoff_delay(attempt)
+                if self.on_error is not None:
+                    self.on_error(kind, e, wait)
+                if last:
+                    raise
+                time.sleep(wait)
+            else:
+                self.limiter.recover()
+                return result
+
+
+class CircuitBreaker:
+    """Blocks a code path for `cooldown` seconds after `threshold` consecutive
+    failures, or for as long as trip() asks. After the cooldown one call is
+    let through again; its failure re-opens the breaker immediately."""
+
+    def __init__(self, threshold=3, cooldown=60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            return time.monotonic() >= self._open_until
+
+    def trip(self, seconds=None):
+        """Open the breaker for `seconds` (default: the cooldown)."""
+        with self._lock:
+            until = time.monotonic() + (self.cooldown if seconds is None else seconds)
+            self._open_until = max(self._open_until, until)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._open_until = time.monotonic() + self.cooldown
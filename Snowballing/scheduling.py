@@ -0,0 +1,99 @@
+"""
+Cost estimation and scheduling of the papers in a snowballing round.
+
+Before a round starts, referenceCount and citationCount of every paper in
+the frontier are fetched with a few batch calls. From them estimate()
+derives, per paper, the API requests its neighbor lookup will take (a
+share of a batch call, plus paginated pages for papers above the inline
+limit, or one paginated call per direction without batching) and the
+neighbor ids it can yield (capped per direction). order() then arranges
+the round by a policy:
+
+  input     input / discovery order
+  cheapest  fewest estimated requests first (then fewest neighbors),
+            so most papers are done early
+  yield     most neighbor ids first, so most of the round's new papers
+            are found early
+
+CostTracker compares the estimate with what the crawl actually used.
+"""
+
+import math
+
+POLICIES = ("input", "cheapest", "yield")
+
+
+def estimate(counts, batch_size, inline_limit, max_results, page_size=1000):
+    """(neighbor requests, neighbors) per paper from (referenceCount, citationCount).
+
+    counts: list of (references, citations); None for papers already
+        cached, which cost no requests
+    batch_size: papers per batch call, or None when every paper uses the
+        paginated endpoints
+    """
+    requests = []
+    neighbors = []
+    for count in counts:
+        if count is None:
+            requests.append(0.0)
+            neighbors.append(0)
+            continue
+        cost = 1.0 / batch_size if batch_size else 0.0
+        total = 0
+        for n in count:
+            capped = min(n or 0, max_results)
+            total += capped
+            if not batch_size:
+                cost += max(1, math.ceil(capped / page_size))
+            elif (n or 0) > inline_limit and capped > inline_limit:
+                cost += math.ceil(capped / page_size)
+        requests.append(cost)
+        neighbors.append(total)
+    return requests, neighbors
+
+
+def order(items, requests, neighbors, policy):
+    """`items` rearranged by `policy` (stable, so ties keep input order)."""
+    if policy not in POLICIES:
+        raise ValueError(f"unknown schedule policy {policy!r} (expected one of {POLICIES})")
+    positions = range(len(items))
+    if policy == "cheapest":
+        positions = sorted(positions, key=lambda i: (requests[i], neighbors[i]))
+    elif policy == "yield":
+        positions = sorted(positions, key=lambda i: -neighbors[i])
+    return [items[i] for i in positions]
+
+
+class CostTracker:
+    """Estimated against actual requests and neighbor ids for one round."""
+
+    def __init__(self, estimates, requests_at_start):
+        """estimates: {item: (requests, neighbors)}; requests_at_start: the
+        neighbor request count when the round begins."""
+        self.estimates = estimates
+        self.start = requests_at_start
+        self.papers = 0
+        self.est_requests = 0.0
+        self.est_neighbors = 0
+        self.neighbors = 0
+
+    def record(self, item, neighbors):
+        """Account for a processed paper that returned `neighbors` ids."""
+        est_requests, est_neighbors = self.estimates.get(item, (0.0, 0))
+        self.papers += 1
+        self.est_requests += est_requests
+        self.est_neighbors += est_neighbors
+        self.neighbors += neighbors
+
+    def report(self, requests_now):
+        """One line comparing the estimate for the processed papers with reality.
+
+        Requests already include batches still in flight, so they run ahead
+        of the processed papers until the round is done.
+        """
+        requests = requests_now - self.start
+        return (
+            f"  Estimate vs actual after {self.papers}/{len(self.estimates)} papers: "
+            f"neighbor requests {requests} (est. {self.est_requests:.0f}), "
+            f"neighbor ids {self.neighbors} (est. {self.est_neighbors})"
+        )
@@ -0,0 +1,305 @@
+"""
+Sharded snowballing: N worker processes share one persistent work queue.
+
+The queue and the discovered-id store are the same SQLite table
+(SHARD_DB, WAL mode), keyed by paper id, so deduplication is exact across
+processes: a neighbor is recorded by whichever worker inserts it first.
+
+  papers(pid PRIMARY KEY, round, status, direction, source, worker)
+
+  status  PENDING  discovered (or seed), still to be expanded
+          CLAIMED  taken by a worker
+          DONE     expanded, or excluded up front
+          LEAF     found in the last round, never expanded
+
+Workers claim batches from the lowest unfinished round only, so rounds
+stay breadth-first. Inserting a batch's neighbors and marking it DONE is
+one transaction. Each worker then fetches metadata for the ids it added
+and writes them as its own Parquet part; the reducer fills in rows whose
+part was lost in a crash and merges everything into OUTPUT_FILE.
+
+A crashed worker is restarted with the same shard number and first
+requeues its own claims; a whole run resumes from SHARD_DB. Each worker
+can use its own API key and request budget.
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow.parquet as pq
+
+from idstore import BACKWARD, FORWARD
+from output import export_excel, merge_parts, remove_parts, write_part
+
+SHARD_DB = "snowball_shards.sqlite"
+MAX_RESTARTS = 3  # per shard
+IDLE_WAIT = 0.2  # seconds between claims while other shards finish a round
+
+PENDING, CLAIMED, DONE, LEAF = 0, 1, 2, 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    pid TEXT PRIMARY KEY,
+    round INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    direction INTEGER NOT NULL,
+    source TEXT,
+    worker INTEGER
+);
+CREATE INDEX IF NOT EXISTS papers_queue ON papers (status, round);
+"""
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _record(pid, direction, source, round_no, meta):
+    return {
+        "PaperId": pid,
+        "Title": meta.get("Title", ""),
+        "DOI": meta.get("DOI", ""),
+        "Direction": "Backward" if direction == BACKWARD else "Forward",
+        "IsBackward": 1 if direction == BACKWARD else 0,
+        "IsForward": 1 if direction == FORWARD else 0,
+        "SourceCount": 1,
+        "SourcePapers": source,
+        "Round": round_no,
+    }
+
+
+def init_queue(db_path, seed_ids, processed_ids):
+    """Create the queue for a fresh run; returns False if one exists (resume)."""
+    conn = _connect(db_path)
+    try:
+        if conn.execute("SELECT 1 FROM papers LIMIT 1").fetchone():
+            # nobody is running: claims of a previous run are pending again
+            conn.execute("UPDATE papers SET status = ? WHERE status = ?", (PENDING, CLAIMED))
+            return False
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR IGNORE INTO papers (pid, round, status, direction) VALUES (?, 0, ?, 0)",
+            ((pid, PENDING) for pid in seed_ids),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO papers (pid, round, status, direction) VALUES (?, 0, ?, 0)",
+            ((pid, DONE) for pid in processed_ids),
+        )
+        conn.execute("COMMIT")
+        return True
+    finally:
+        conn.close()
+
+
+def _claim(conn, shard, size):
+    """(round of the claimed papers, [pid, ...]); None when nothing is left.
+
+    An empty list means the current round is only waiting for other shards.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT MIN(round) FROM papers WHERE status IN (?, ?)", (PENDING, CLAIMED)
+        ).fetchone()
+        if row[0] is None:
+            return None
+        round_found = row[0]
+        pids = [
+            r[0]
+            for r in conn.execute(
+                "SELECT pid FROM papers WHERE status = ? AND round = ? ORDER BY rowid LIMIT ?",
+                (PENDING, round_found, size),
+            )
+        ]
+        conn.executemany(
+            "UPDATE papers SET status = ?, worker = ? WHERE pid = ?",
+            ((CLAIMED, shard, pid) for pid in pids),
+        )
+        return round_found + 1, pids
+    finally:
+        conn.execute("COMMIT")
+
+
+def _commit_batch(conn, round_no, rounds, results):
+    """Insert the neighbors of a fetched batch and mark it done, atomically.
+
+    Returns [(pid, direction, source)] for the ids this shard added first.
+    """
+    status = PENDING if round_no < rounds else LEAF
+    added = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for src, (backward, forward) in results.items():
+            for direction, neighbors in ((BACKWARD, backward), (FORWARD, forward)):
+                for pid in neighbors:
+                    cur = conn.execute(
+                        "INSERT OR IGNORE INTO papers (pid, round, status, direction, source)"
+                        " VALUES (?, ?, ?, ?, ?)",
+                        (pid, round_no, status, direction, src),
+                    )
+                    if cur.rowcount:
+                        added.append((pid, direction, src))
+        conn.executemany(
+            "UPDATE papers SET status = ? WHERE pid = ?", ((DONE, pid) for pid in results)
+        )
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return added
+
+
+def _worker(shard, cfg):
+    """Entry point of one shard process."""
+    os.chdir(cfg["workdir"])
+    import snowballing as sb
+    from ratelimit import TokenBucket
+    from s2http import make_client
+
+    if cfg["api_key"]:
+        sb.sch = make_client(sb.API_URL, cfg["api_key"])
+    sb.limiter = TokenBucket(cfg["rps"], max(1, cfg["rps"]), cfg["rps"] / 16)
+    sb.retry_policy.limiter = sb.limiter
+    if sb.METRICS_PATH:
+        sb.metrics.start(f"{os.path.splitext(sb.METRICS_PATH)[0]}.shard{shard:02d}.prom")
+
+    conn = _connect(cfg["db"])
+    conn.execute("UPDATE papers SET status = ? WHERE status = ? AND worker = ?", (PENDING, CLAIMED, shard))
+    batch_size = sb.NEIGHBOR_BATCH_SIZE if sb.BATCH_NEIGHBORS else sb.MAX_WORKERS
+    done = 0
+    with ThreadPoolExecutor(max_workers=sb.MAX_WORKERS) as pool:
+        while True:
+            claim = _claim(conn, shard, batch_size)
+            if claim is None:
+                break
+            round_no, pids = claim
+            if not pids:
+                time.sleep(IDLE_WAIT)
+                continue
+            if sb.BATCH_NEIGHBORS:
+                fetched = sb.get_neighbors_batch(pids)
+                results = {pid: fetched[pid] for pid in pids}  # claim order, like a serial run
+            else:
+                results = dict(zip(pids, pool.map(sb.get_neighbors, pids)))
+            added = _commit_batch(conn, round_no, cfg["rounds"], results)
+            done += len(pids)
+            print(f"  [shard {shard}] round {round_no}: +{len(pids)} papers ({done} total), {len(added)} new")
+            if added:
+                meta = sb.fetch_metadata([pid for pid, _, _ in added])
+                records = [_record(pid, d, src, round_no, meta.get(pid, {})) for pid, d, src in added]
+                write_part(records, cfg["parts_dir"], f"shard{shard:03d}-{added[0][0]}")
+    conn.close()
+    sb.metrics.stop()
+
+
+def _written_ids(parts_dir):
+    ids = set()
+    if os.path.isdir(parts_dir):
+        for name in os.listdir(parts_dir):
+            if name.endswith(".parquet"):
+                table = pq.read_table(os.path.join(parts_dir, name), columns=["PaperId"])
+                ids.update(table.column("PaperId").to_pylist())
+    return ids
+
+
+def reduce_output(db_path, parts_dir, output_file, excel_file, fetch_metadata, batch_size=10000):
+    """Write rows missing from the shard parts, then merge all parts.
+
+    Returns (discovered ids, backward count, forward count).
+    """
+    conn = _connect(db_path)
+    written = _written_ids(parts_dir)
+    rows = conn.execute(
+        "SELECT pid, direction, source, round FROM papers WHERE direction != 0 ORDER BY rowid"
+    ).fetchall()
+    conn.close()
+    missing = [row for row in rows if row[0] not in written]
+    for start in range(0, len(missing), batch_size):
+        chunk = missing[start : start + batch_size]
+        meta = fetch_metadata([pid for pid, _, _, _ in chunk])
+        records = [_record(pid, d, src, r, meta.get(pid, {})) for pid, d, src, r in chunk]
+        write_part(records, parts_dir, f"reducer-{start:012d}")
+    if missing:
+        print(f"  Reducer wrote {len(missing)} rows whose shard part was missing")
+
+    n_rows = merge_parts(parts_dir, output_file)
+    print(f"  [Saved] {output_file} ({n_rows} rows)")
+    if excel_file:
+        export_excel(output_file, excel_file)
+        print(f"  [Saved] {excel_file}")
+    remove_parts(parts_dir)
+    return (
+        [pid for pid, _, _, _ in rows],
+        sum(1 for row in rows if row[1] == BACKWARD),
+        sum(1 for row in rows if row[1] == FORWARD),
+    )
+
+
+def run_sharded(
+    seed_ids,
+    processed_ids,
+    shards,
+    rounds=1,
+    excel_file=None,
+    api_keys=(),
+    shard_rps=None,
+):
+    """Crawl with `shards` worker processes; same return value as run_snowballing.
+
+    api_keys: keys handed to the shards round-robin (empty: the default client)
+    shard_rps: requests per second per shard; by default each shard gets
+        its own key's full REQUESTS_PER_SECOND, or an equal share of it when
+        shards share a key
+    """
+    import snowballing as sb
+
+    if init_queue(SHARD_DB, seed_ids, processed_ids):
+        print(f"  Work queue created: {SHARD_DB}")
+    else:
+        print(f"  Resuming sharded crawl from {SHARD_DB}")
+
+    if shard_rps is None:
+        sharing = shards / max(len(api_keys), 1)
+        shard_rps = sb.REQUESTS_PER_SECOND / max(sharing, 1)
+    ctx = multiprocessing.get_context("spawn")
+    procs = {}
+    restarts = dict.fromkeys(range(shards), 0)
+
+    def start(shard):
+        cfg = {
+            "workdir": os.getcwd(),
+            "db": SHARD_DB,
+            "parts_dir": sb.PARTS_DIR,
+            "rounds": rounds,
+            "rps": shard_rps,
+            "api_key": api_keys[shard % len(api_keys)] if api_keys else None,
+        }
+        procs[shard] = ctx.Process(target=_worker, args=(shard, cfg), name=f"shard-{shard}")
+        procs[shard].start()
+
+    for shard in range(shards):
+        start(shard)
+    while procs:
+        for shard, proc in list(procs.items()):
+            proc.join(timeout=0.5)
+            if proc.exitcode is None:
+                continue
+            del procs[shard]
+            if proc.exitcode != 0:
+                if restarts[shard] >= MAX_RESTARTS:
+                    raise RuntimeError(f"shard {shard} failed {MAX_RESTARTS + 1} times; rerun to resume")
+                restarts[shard] += 1
+                print(f"  Shard {shard} exited with {proc.exitcode}; restarting it")
+                start(shard)
+
+    result = reduce_output(SHARD_DB, sb.PARTS_DIR, sb.OUTPUT_FILE, excel_file, sb.fetch_metadata)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(SHARD_DB + suffix):
+            os.remove(SHARD_DB + suffix)
+    return result
@@ -1,38 +1,234 @@
 """
-Snowballing script: run 1 round of forward + backward discovery.
+Snowballing script: run forward + backward discovery, 1 round by default
+(use --rounds N for a breadth-first crawl of depth N).
 Input: Excel file with PaperId column (configurable below).
-Output: Excel file with discovered papers (configurable below).
+Output: Parquet file with discovered papers, plus an optional Excel copy
+(configurable below).
+Neighbors are fetched concurrently (MAX_WORKERS) under a shared
+REQUESTS_PER_SECOND token bucket, NEIGHBOR_BATCH_SIZE seeds per
+batch request.
 """
 
-import itertools
+import argparse
+import json
 import os
-import pickle
 import time
-from semanticscholar import SemanticScholar
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 
+from deltastore import DeltaStore
+from graphstore import EdgeLog, build_graph, read_edges
+from idindex import INDEX_KINDS, index_spec, make_index, remove_index_files
+from idstore import (
+    BACKWARD,
+    DIRECTION_FLAGS,
+    DIRECTION_NAMES,
+    FORWARD,
+    IN_ROUND,
+    PROCESSED,
+    IdTable,
+    SourceLists,
+)
+from journal import CheckpointJournal
+from metrics import Metrics
+from output import DELTA_SCHEMA, OUTPUT_SCHEMA, export_excel, merge_parts, remove_parts, write_part
+from prefetch import MetadataPrefetcher
+from ranking import DEFAULT_WEIGHTS, SIGNALS, score_candidates, select
+from ratelimit import TokenBucket
+from s2cache import ResponseCache
+from s2dataset import LocalDataset
+from s2http import make_client
+from s2retry import THROTTLED, CircuitBreaker, RetryPolicy
+from scheduling import POLICIES, CostTracker, estimate, order
+
 # =============================================================================
 # Configuration section - specify input/output files here
 # =============================================================================
 INPUT_FILE = "papers_with_ids.xlsx"  # Input file path (must contain a PaperId column)
-OUTPUT_FILE = "snowball_output.xlsx"  # Output file path
+OUTPUT_FILE = "snowball_output.parquet"  # Output file path (Parquet)
+EXCEL_OUTPUT_FILE = "snowball_output.xlsx"  # Optional Excel copy; None (or --no-excel) to skip
 # =============================================================================
 
-sch = SemanticScholar()
+# Set S2_API_URL to point at another server (e.g. mock_s2_server.py)
+API_URL = os.environ.get("S2_API_URL")
+
+# Pooled keep-alive session (s2http.py); retries are handled by
+# s2retry.RetryPolicy, not by the client library.
+sch = make_client(API_URL)
 
 # Limits and persistence settings
 MAX_RESULTS_PER_DIRECTION = 2000  # Cap per direction per paper; adjust as needed
+PAGE_SIZE = 1000  # neighbors per references/citations request (API maximum)
 METADATA_BATCH_SIZE = 200
-SAVE_EVERY = 200  # save checkpoint + append rows every N processed papers
-STATE_PATH = "snowball_checkpoint.pkl"
-CSV_TEMP_PATH = "snowball_temp.csv"  # Temporary CSV file
+SAVE_EVERY = 200  # write a Parquet part with new rows every N processed papers
+STATE_PATH = "snowball_checkpoint.pkl"  # compacted snapshot of the crawl state
+JOURNAL_PATH = "snowball_checkpoint.journal"  # per-paper results since the snapshot
+COMPACT_EVERY = 5000  # fold the journal into a new snapshot every N events
+PARTS_DIR = "snowball_parts"  # Parquet part files, merged into OUTPUT_FILE at the end
+GRAPH_DIR = "snowball_graph"  # CSR citation graph of all crawled edges (graphstore.py); None to skip
+EDGES_PATH = "snowball_edges.bin"  # edge log the graph is built from at the end
+
+# Offline mode (s2dataset.py): with DATASET_DIR (or --dataset) set to a local
+# Semantic Scholar dataset dump (papers/ and citations/ JSON-lines files),
+# neighbors and metadata come from an index of the dump built once in
+# DATASET_INDEX_DIR instead of from the API.
+DATASET_DIR = None
+DATASET_INDEX_DIR = "snowball_dataset_index"
+dataset = None  # the opened LocalDataset
+
+# Incremental mode (deltastore.py, --delta): DELTA_PATH keeps the counts and
+# neighbor ids of every expanded paper and the ids emitted by earlier delta
+# runs. A rerun only refetches papers whose referenceCount/citationCount
+# changed and writes only papers no earlier run emitted, to
+# <OUTPUT_FILE>_delta_<tag>.parquet with a Delta column holding the tag.
+DELTA_PATH = "snowball_delta.sqlite"
+delta = None  # the opened DeltaStore
+round_counts = {}  # fresh (referenceCount, citationCount) of this round's papers
+
+# Id membership index (idindex.py): "dict" keeps the id -> int map in RAM,
+# "sqlite" keeps it on disk at ID_INDEX_PATH and "bloom" adds an in-memory
+# Bloom filter in front of the on-disk map. All are exact. "auto" uses dict,
+# or sqlite once seeds * ESTIMATED_NEW_PER_PAPER ** rounds reaches
+# AUTO_INDEX_THRESHOLD (bench_memory.py measures bloom as both larger and
+# slower than sqlite, so auto never picks it).
+ID_INDEX = "auto"
+ID_INDEX_PATH = "snowball_ids.sqlite"
+AUTO_INDEX_THRESHOLD = 5_000_000
+ESTIMATED_NEW_PER_PAPER = 20
+
+# Relevance ranking (ranking.py): at the end of every round the new papers
+# are scored from the crawled graph and written to RANKING_FILE. Only the
+# FRONTIER_TOP_K best and/or those scoring >= FRONTIER_MIN_SCORE are
+# expanded in the next round (None keeps all). Needs GRAPH_DIR.
+RANKING_FILE = "snowball_ranking.parquet"
+FRONTIER_TOP_K = None
+FRONTIER_MIN_SCORE = None
+RANKING_WEIGHTS = DEFAULT_WEIGHTS
+
+# Cost estimation (scheduling.py): before each round the referenceCount and
+# citationCount of its papers are fetched, COUNT_BATCH_SIZE per batch call,
+# to estimate its requests and wall time; the estimate is compared with the
+# actual numbers as the round runs. The round is then ordered by SCHEDULE:
+# "input", "cheapest" (fewest requests first) or "yield" (most neighbors
+# first). ESTIMATE_COSTS = False skips the pre-pass and keeps input order.
+ESTIMATE_COSTS = True
+SCHEDULE = "input"
+COUNT_BATCH_SIZE = 500
+
+# Concurrency settings: MAX_WORKERS papers are fetched in parallel, while all
+# API calls share one global budget of REQUESTS_PER_SECOND (burst RATE_BURST).
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 1.0
+RATE_BURST = 1
+
+# Batched neighbor retrieval: fetch references + citations for up to
+# NEIGHBOR_BATCH_SIZE seeds per get_papers call. Papers with more than
+# INLINE_NEIGHBOR_LIMIT ids in a direction use the paginated endpoints.
+BATCH_NEIGHBORS = True
+NEIGHBOR_BATCH_SIZE = 100
+INLINE_NEIGHBOR_LIMIT = 1000
+
+# Failed requests are retried up to RETRY_ATTEMPTS times with jittered
+# exponential backoff; 429s also halve the shared rate (never below
+# MIN_REQUESTS_PER_SECOND), which climbs back after successful calls.
+# The get_paper fallback is suspended for FALLBACK_COOLDOWN seconds while
+# the API throttles or after FALLBACK_FAILURES consecutive fallback failures.
+RETRY_ATTEMPTS = 6
+MIN_REQUESTS_PER_SECOND = REQUESTS_PER_SECOND / 16
+FALLBACK_FAILURES = 3
+FALLBACK_COOLDOWN = 60
+
+limiter = TokenBucket(REQUESTS_PER_SECOND, RATE_BURST, MIN_REQUESTS_PER_SECOND)
+
+# On-disk response cache shared with getDoi.py (set CACHE_PATH = None to disable).
+CACHE_PATH = "s2_cache.sqlite"
+CACHE_TTL = 30 * 24 * 3600  # seconds before a cached response is refetched
+CACHE_MAX_BYTES = 2 * 1024**3  # least recently used entries are evicted beyond this
+
+cache = ResponseCache(CACHE_PATH, CACHE_TTL, CACHE_MAX_BYTES) if CACHE_PATH else None
+
+# Run metrics (latency per endpoint, errors, bytes, papers/s, ETA) in
+# Prometheus text format, rewritten every METRICS_INTERVAL seconds.
+# Set METRICS_PORT (or --metrics-port) to also serve them on /metrics.
+METRICS_PATH = "snowball_metrics.prom"
+METRICS_PORT = None
+METRICS_INTERVAL = 10
+
+metrics = Metrics()
+
+
+def _on_request_error(kind, exc, wait):
+    metrics.event(f"retry_{kind}" if wait is not None else f"gave_up_{kind}")
+    if kind == THROTTLED:
+        fallback_breaker.trip(max(wait or 0.0, FALLBACK_COOLDOWN))
+
+
+retry_policy = RetryPolicy(limiter, RETRY_ATTEMPTS, on_error=_on_request_error)
+fallback_breaker = CircuitBreaker(FALLBACK_FAILURES, FALLBACK_COOLDOWN)
+
+NEIGHBOR_FIELDS = ["paperId"]
+FALLBACK_FIELDS = [
+    "references.paperId",
+    "citations.paperId",
+    "referenceCount",
+    "citationCount",
+]
+METADATA_FIELDS = ["paperId", "title", "externalIds"]
+COUNT_FIELDS = ["paperId", "referenceCount", "citationCount"]
+NEIGHBOR_OPS = ("batch_neighbors", "references", "citations", "paper")  # metrics timers
+BATCH_NEIGHBOR_FIELDS = [
+    "paperId",
+    "references.paperId",
+    "citations.paperId",
+    "referenceCount",
+    "citationCount",
+]
+
+
+def _throttle():
+    """Wait for the shared rate limiter (time spent waiting is recorded)."""
+    with metrics.timer("rate_limit_wait"):
+        limiter.acquire()
+
+
+def _payload_bytes(objects):
+    """Approximate response size: the JSON of each returned object's raw data."""
+    return sum(len(json.dumps(getattr(obj, "raw_data", None) or {})) for obj in objects)
+
+
+def _request(op, fn, payload=lambda result: ()):
+    """One API call `fn()` under the shared limiter and retry policy, timed
+    as `op`; `payload(result)` gives the returned objects for byte counts."""
+
+    def attempt():
+        _throttle()
+        with metrics.timer(op) as t:
+            result = fn()
+            t.add_bytes(_payload_bytes(payload(result)))
+        return result
+
+    return retry_policy.call(attempt)
+
+
+def _cached(endpoint, ident, fields, fetch):
+    """Serve `fetch()` through the response cache when it is enabled."""
+    if cache is None:
+        return fetch()
+    if delta is not None:
+        # a delta run needs current neighbor lists; it refreshes the cache
+        value = fetch()
+        cache.set(ResponseCache.make_key(endpoint, ident, fields), value)
+        return value
+    return cache.get_or_fetch(ResponseCache.make_key(endpoint, ident, fields), fetch)
 
 
 def _safe_collect_reference_ids(items):
-    """Extract paperIds from Reference/Citation objects safely, capped per paper."""
+    """Extract paperIds from Reference/Citation objects safely."""
     ids = []
-    # items can be PaginatedResults (iterable) or list
-    for item in itertools.islice(items or [], MAX_RESULTS_PER_DIRECTION):
+    for item in items or []:
         paper = getattr(item, "paper", None)
         pid = getattr(paper, "paperId", None)
         if pid:
@@ -40,70 +236,137 @@ def _safe_collect_reference_ids(items):
     return ids
 
 
+def _collect_pages(op, first_page):
+    """Neighbor ids of a paginated endpoint, capped per paper.
+
+    `first_page(limit)` returns the library's PaginatedResults. Every page is
+    its own request under the shared limiter, retry policy and `op` timer;
+    the results only advance their offset on success, so a retry asks for
+    the same page again instead of starting over.
+    """
+    results = _request(
+        op, lambda: first_page(min(PAGE_SIZE, MAX_RESULTS_PER_DIRECTION)), lambda r: r.items
+    )
+    while len(results) < MAX_RESULTS_PER_DIRECTION and results._has_next_page():
+        _request(op, results._get_next_page, lambda items: items)
+    return _safe_collect_reference_ids(results.items[:MAX_RESULTS_PER_DIRECTION])
+
+
 def _fallback_collect_from_paper(pid, have_backward, have_forward):
     """Fallback to the generic get_paper endpoint when the paginated ones fail."""
     backward = []
     forward = []
-    try:
-        paper = sch.get_paper(
-            pid,
-            fields=[
-                "references.paperId",
-                "citations.paperId",
-                "referenceCount",
-                "citationCount",
-            ],
-        )
-        ref_count = getattr(paper, "referenceCount", None)
-        cit_count = getattr(paper, "citationCount", None)
 
-        if not have_backward and getattr(paper, "references", None):
-            backward = [
+    def fetch():
+        paper = _request(
+            "paper", lambda: sch.get_paper(pid, fields=FALLBACK_FIELDS), lambda p: [p]
+        )
+        return {
+            "references": [
                 str(ref.paperId)
-                for ref in paper.references
+                for ref in (getattr(paper, "references", None) or [])
                 if getattr(ref, "paperId", None)
-            ]
+            ],
+            "citations": [
+                str(cit.paperId)
+                for cit in (getattr(paper, "citations", None) or [])
+                if getattr(cit, "paperId", None)
+            ],
+            "referenceCount": getattr(paper, "referenceCount", None),
+            "citationCount": getattr(paper, "citationCount", None),
+        }
+
+    try:
+        paper = _cached("paper", pid, FALLBACK_FIELDS, fetch)
+        fallback_breaker.record_success()
+        ref_count = paper["referenceCount"]
+        cit_count = paper["citationCount"]
+
+        if not have_backward:
+            backward = paper["references"]
             if ref_count and not backward:
                 print(
                     f"    referenceCount={ref_count} but no reference ids returned for {pid}"
                 )
 
-        if not have_forward and getattr(paper, "citations", None):
-            forward = [
-                str(cit.paperId)
-                for cit in paper.citations
-                if getattr(cit, "paperId", None)
-            ]
+        if not have_forward:
+            forward = paper["citations"]
             if cit_count and not forward:
                 print(
                     f"    citationCount={cit_count} but no citation ids returned for {pid}"
                 )
     except Exception as e:
+        fallback_breaker.record_failure()
+        metrics.event("fallback_failed")
         print(f"    Fallback get_paper failed for {pid}: {e}")
 
     return backward, forward
 
 
+def _fetch_references(pid):
+    """Paginated references endpoint (cached)."""
+
+    def fetch():
+        return _collect_pages(
+            "references",
+            lambda limit: sch.get_paper_references(pid, fields=NEIGHBOR_FIELDS, limit=limit),
+        )
+
+    return _cached("references", pid, NEIGHBOR_FIELDS, fetch)
+
+
+def _fetch_citations(pid):
+    """Paginated citations endpoint (cached)."""
+
+    def fetch():
+        return _collect_pages(
+            "citations",
+            lambda limit: sch.get_paper_citations(pid, fields=NEIGHBOR_FIELDS, limit=limit),
+        )
+
+    return _cached("citations", pid, NEIGHBOR_FIELDS, fetch)
+
+
+def _cached_neighbors(pid):
+    """(backward, forward) from the response cache, or None."""
+    if cache is None or delta is not None:
+        return None
+    backward = cache.get(ResponseCache.make_key("references", pid, NEIGHBOR_FIELDS))
+    forward = cache.get(ResponseCache.make_key("citations", pid, NEIGHBOR_FIELDS))
+    if backward is None or forward is None:
+        return None
+    return backward, forward
+
+
 def get_neighbors(pid):
     """Return backward + forward paperId lists with retry + fallback."""
+    if dataset is not None:
+        return get_neighbors_batch([pid])[pid]
     backward = []
     forward = []
     errors = []
+    stored_backward, stored_forward = (
+        delta.neighbors(pid, round_counts.get(pid)) if delta is not None else (None, None)
+    )
 
     try:
-        refs = sch.get_paper_references(pid, fields=["paperId"], limit=1000)
-        backward = _safe_collect_reference_ids(refs)
+        backward = stored_backward if stored_backward is not None else _fetch_references(pid)
     except Exception as e:
         errors.append(f"references endpoint: {e}")
 
     try:
-        cits = sch.get_paper_citations(pid, fields=["paperId"], limit=1000)
-        forward = _safe_collect_reference_ids(cits)
+        forward = stored_forward if stored_forward is not None else _fetch_citations(pid)
     except Exception as e:
         errors.append(f"citations endpoint: {e}")
 
-    # If endpoints failed or returned empty, fall back to the simpler paper lookup.
-    if (not backward or not forward) and errors:
+    # If endpoints failed or returned empty, fall back to the simpler paper
+    # lookup - unless the API is throttling us, when one more request only
+    # makes things worse (the breaker is tripped by every 429).
+    if (not backward or not forward) and errors and not fallback_breaker.allow():
+        metrics.event("fallback_skipped")
+        print(f"    Skipping get_paper fallback for {pid}: circuit breaker open")
+    elif (not backward or not forward) and errors:
+        metrics.event("fallback")
         fb_backward, fb_forward = _fallback_collect_from_paper(
             pid, have_backward=bool(backward), have_forward=bool(forward)
         )
@@ -118,17 +381,124 @@ def get_neighbors(pid):
     return backward, forward
 
 
+def _inline_or_paginated(pid, paper, attr, count_attr, fetch_paginated):
+    """Neighbor ids inlined in a batch response, or the paginated endpoint's
+    result when the paper has more than INLINE_NEIGHBOR_LIMIT of them."""
+    inline = [
+        str(item.paperId)
+        for item in (getattr(paper, attr, None) or [])
+        if getattr(item, "paperId", None)
+    ][:MAX_RESULTS_PER_DIRECTION]
+    count = getattr(paper, count_attr, None) or 0
+    if count > INLINE_NEIGHBOR_LIMIT and len(inline) < min(count, MAX_RESULTS_PER_DIRECTION):
+        if delta is not None:
+            # only the direction whose count changed is paged through again
+            stored = delta.neighbors(pid, round_counts.get(pid))[attr == "citations"]
+            if stored is not None:
+                return stored
+        try:
+            return fetch_paginated(pid)
+        except Exception as e:
+            print(f"    Paginated {attr} failed for {pid}, keeping {len(inline)} inline ids: {e}")
+            return inline
+    if cache is not None:
+        cache.set(ResponseCache.make_key(attr, pid, NEIGHBOR_FIELDS), inline)
+    return inline
+
+
+def get_neighbors_batch(pids):
+    """Return {pid: (backward, forward)} for many papers with one batch request.
+
+    References and citations come inline from the get_papers batch endpoint;
+    only papers with more than INLINE_NEIGHBOR_LIMIT in a direction drop
+    down to the paginated endpoints. Cached papers are not requested, and if
+    the batch call fails every paper falls back to get_neighbors.
+    """
+    if dataset is not None:
+        with metrics.timer("dataset_neighbors"):
+            result = dataset.neighbors(pids, MAX_RESULTS_PER_DIRECTION)
+        for pid in pids:
+            if pid not in result:
+                print(f"    Not found in the dataset: {pid}")
+                result[pid] = ([], [])
+        return result
+
+    result = {}
+    misses = []
+    for pid in pids:
+        if delta is not None:
+            stored = delta.neighbors(pid, round_counts.get(pid))
+            if None not in stored:
+                metrics.event("delta_unchanged")
+                result[pid] = stored
+                continue
+        cached = _cached_neighbors(pid)
+        if cached is not None:
+            result[pid] = cached
+        else:
+            misses.append(pid)
+    if not misses:
+        return result
+
+    try:
+        papers = _request(
+            "batch_neighbors",
+            lambda: sch.get_papers(misses, fields=BATCH_NEIGHBOR_FIELDS, return_not_found=True),
+            lambda r: r[0] if isinstance(r, tuple) else r,
+        )
+    except Exception as e:
+        # The per-paper requests still go through the (lowered) shared rate.
+        metrics.event("batch_fallback")
+        print(f"    Neighbor batch of {len(misses)} failed, fetching one by one: {e}")
+        for pid in misses:
+            result[pid] = get_neighbors(pid)
+        return result
+
+    if isinstance(papers, tuple):
+        papers, _missing = papers
+    by_id = {str(p.paperId): p for p in papers if getattr(p, "paperId", None)}
+
+    for pid in misses:
+        paper = by_id.get(pid)
+        if paper is None:
+            print(f"    Not found by the batch endpoint: {pid}")
+            result[pid] = ([], [])
+            continue
+        backward = _inline_or_paginated(
+            pid, paper, "references", "referenceCount", _fetch_references
+        )
+        forward = _inline_or_paginated(
+            pid, paper, "citations", "citationCount", _fetch_citations
+        )
+        result[pid] = (backward, forward)
+    return result
+
+
 def fetch_metadata(paper_ids):
-    """Fetch title and DOI in batches."""
+    """Fetch title and DOI in batches (cached per paper id)."""
+    if dataset is not None:
+        with metrics.timer("dataset_metadata"):
+            return dataset.metadata(paper_ids)
     meta = {}
-    ids = list(paper_ids)
+    ids = []
+    for pid in paper_ids:
+        cached = None
+        if cache is not None:
+            cached = cache.get(
+                ResponseCache.make_key("paper/batch", pid, METADATA_FIELDS)
+            )
+        if cached is None:
+            ids.append(pid)
+        elif cached:  # {} marks an id the API reported as not found
+            meta[pid] = cached
+
     for start in range(0, len(ids), METADATA_BATCH_SIZE):
         batch = ids[start : start + METADATA_BATCH_SIZE]
         try:
-            papers = sch.get_papers(
-                batch,
-                fields=["paperId", "title", "externalIds"],
-                return_not_found=True,
+            papers = _request(
+                "metadata",
+                lambda: sch.get_papers(batch, fields=METADATA_FIELDS, return_not_found=True),
+                lambda r: r[0] if isinstance(r, tuple) else r,
             )
         except Exception as e:
             print(f"    Metadata batch failed ({start}-{start+len(batch)}): {e}")
@@ -148,38 +518,290 @@ def fetch_metadata(paper_ids):
                 "Title": title or "",
                 "DOI": doi or "",
             }
+
+        if cache is not None:
+            cache.set_many(
+                (
+                    ResponseCache.make_key("paper/batch", pid, METADATA_FIELDS),
+                    meta.get(pid, {}),
+                )
+                for pid in batch
+            )
     return meta
 
 
+def fetch_counts(paper_ids):
+    """{pid: (referenceCount, citationCount)} in batches (cached per paper id);
+    papers the API does not know are left out."""
+    if dataset is not None:
+        return dataset.counts(paper_ids)
+    counts = {}
+    ids = []
+    for pid in paper_ids:
+        cached = None
+        if cache is not None and delta is None:  # a delta run compares current counts
+            cached = cache.get(ResponseCache.make_key("paper/batch", pid, COUNT_FIELDS))
+        if cached is None:
+            ids.append(pid)
+        elif cached:  # [] marks an id the API reported as not found
+            counts[pid] = tuple(cached)
+
+    for start in range(0, len(ids), COUNT_BATCH_SIZE):
+        batch = ids[start : start + COUNT_BATCH_SIZE]
+        try:
+            papers = _request(
+                "counts",
+                lambda: sch.get_papers(batch, fields=COUNT_FIELDS, return_not_found=True),
+                lambda r: r[0] if isinstance(r, tuple) else r,
+            )
+        except Exception as e:
+            print(f"    Count batch failed ({start}-{start+len(batch)}): {e}")
+            continue
+        if isinstance(papers, tuple):
+            papers, _missing = papers
+        for p in papers:
+            pid = str(getattr(p, "paperId", None) or "")
+            if pid:
+                counts[pid] = (
+                    getattr(p, "referenceCount", None) or 0,
+                    getattr(p, "citationCount", None) or 0,
+                )
+        if cache is not None:
+            cache.set_many(
+                (ResponseCache.make_key("paper/batch", pid, COUNT_FIELDS), list(counts.get(pid, ())))
+                for pid in batch
+            )
+    return counts
+
+
+def plan_round(ids, frontier, round_no):
+    """Estimate the cost of a round and order its papers by SCHEDULE.
+
+    In a delta run the counts also tell which papers are unchanged since
+    the last run (they cost no neighbor requests).
+
+    Returns (frontier in processing order, CostTracker or None).
+    """
+    round_counts.clear()
+    if not (ESTIMATE_COSTS or delta is not None) or not frontier:
+        return frontier, None
+    pids = ids.decode_many(frontier)
+    with metrics.timer("estimate"):
+        cached = set()
+        if dataset is None:
+            cached = {pid for pid in pids if _cached_neighbors(pid) is not None}
+        counts = fetch_counts([pid for pid in pids if pid not in cached])
+        round_counts.update(counts)
+        unchanged = set()
+        if delta is not None:
+            unchanged = {pid for pid in pids if None not in delta.neighbors(pid, counts.get(pid))}
+            print(f"  Round {round_no}: {len(unchanged)}/{len(pids)} papers unchanged since the last delta run")
+    requests, neighbors = estimate(
+        [None if pid in cached or pid in unchanged else counts.get(pid, (0, 0)) for pid in pids],
+        NEIGHBOR_BATCH_SIZE if BATCH_NEIGHBORS else None,
+        INLINE_NEIGHBOR_LIMIT,
+        MAX_RESULTS_PER_DIRECTION,
+    )
+    if dataset is not None:
+        requests = [0.0] * len(requests)  # answered locally
+    capped = sum(
+        1 for pid in pids if max(counts.get(pid, (0, 0))) > MAX_RESULTS_PER_DIRECTION
+    )
+    total = sum(requests)
+    # Not every neighbor id is new, so metadata requests are an upper bound.
+    metadata = 0 if dataset is not None else -(-sum(neighbors) // METADATA_BATCH_SIZE)
+    if not ESTIMATE_COSTS:
+        return frontier, None
+    minutes = (total + metadata) / limiter.rate / 60
+    unknown = sum(1 for pid in pids if pid not in counts and pid not in cached)
+    print(
+        f"  Round {round_no} estimate: {total:.0f} neighbor requests + up to {metadata} metadata "
+        f"requests (<= {minutes:.1f} min at {limiter.rate:g} req/s), up to {sum(neighbors)} "
+        f"neighbor ids; {unknown} papers unknown, {len(cached)} cached, "
+        + (f"{len(unchanged)} unchanged, " if delta is not None else "")
+        + f"{capped} above MAX_RESULTS_PER_DIRECTION"
+    )
+    tracker = CostTracker(
+        dict(zip(frontier, zip(requests, neighbors))), metrics.calls(*NEIGHBOR_OPS)
+    )
+    if SCHEDULE != "input":
+        frontier = array("l", order(frontier, requests, neighbors, SCHEDULE))
+        print(f"  Round {round_no} scheduled {SCHEDULE} first")
+    return frontier, tracker
+
+
+journal = CheckpointJournal(STATE_PATH, JOURNAL_PATH)
+
+
 def save_state(state):
-    with open(STATE_PATH, "wb") as f:
-        pickle.dump(state, f)
+    """Write a full snapshot of `state` and reset the journal."""
+    with metrics.timer("save_state"):
+        journal.compact(state)
+
+
+def _add_neighbors(ids, sources, src, neighbors, direction, buffer_new_ids, round_new_ids):
+    """Record the not-yet-seen ids among `neighbors`; returns them as strings.
+
+    Shared by the live crawl and journal replay so both intern ids in the
+    same order.
+    """
+    flags = ids.flags
+    new = []
+    for n_pid in neighbors:
+        idx = ids.get(n_pid)
+        if idx is not None and flags[idx] & (PROCESSED | IN_ROUND):
+            continue
+        if idx is None:
+            idx = ids.intern(n_pid)
+        flags[idx] |= IN_ROUND | direction
+        sources.add(idx, src, direction)
+        buffer_new_ids.append(idx)
+        round_new_ids.append(idx)
+        new.append(n_pid)
+    return new
+
+
+def _apply_event(state, event):
+    """Replay one journal event onto a snapshot state dict."""
+    if event["e"] == "paper":
+        ids = state["ids"]
+        src = ids.get(event["pid"])
+        pending_ids = state["pending_ids"]
+        if pending_ids and pending_ids[-1] == src:
+            pending_ids.pop()
+        elif src in pending_ids:
+            pending_ids.remove(src)
+        state["processed_in_round"] += 1
+        if "edges" in event:
+            state["edges_end"] = event["edges"]
+        for direction in (BACKWARD, FORWARD):
+            _add_neighbors(
+                ids,
+                state["sources"],
+                src,
+                event[DIRECTION_NAMES[direction]],
+                direction,
+                state["buffer_new_ids"],
+                state["round_new_ids"],
+            )
+    elif event["e"] == "flush":
+        state["buffer_new_ids"] = array("l")
+
+
+def _compact_legacy_state(state):
+    """Convert a checkpoint of str sets/dicts into the interned representation."""
+    ids = IdTable()
+    sources = SourceLists()
+    for pid in state["processed_ids"]:
+        ids.flags[ids.intern(pid)] |= PROCESSED
+    round_new_ids = array("l")
+    for pid, pid_sources in state["paper_sources"].items():
+        idx = ids.intern(pid)
+        if pid in state["round_new_ids"]:
+            ids.flags[idx] |= IN_ROUND
+            round_new_ids.append(idx)
+        if pid in state["all_backward"]:
+            ids.flags[idx] |= BACKWARD
+        if pid in state["all_forward"]:
+            ids.flags[idx] |= FORWARD
+        for src, direction in pid_sources:
+            sources.add(idx, ids.intern(src), DIRECTION_FLAGS[direction])
+    return {
+        "pending_ids": array("l", (ids.intern(pid) for pid in state["pending_ids"])),
+        "total_papers": state["total_papers"],
+        "ids": ids,
+        "sources": sources,
+        "round_new_ids": round_new_ids,
+        "processed_in_round": state["processed_in_round"],
+        "buffer_new_ids": array("l", (ids.get(pid) for pid in state["buffer_new_ids"])),
+        "round": state.get("round", 1),
+        "rounds": state.get("rounds", 1),
+    }
 
 
 def load_state():
-    if os.path.exists(STATE_PATH):
-        try:
-            with open(STATE_PATH, "rb") as f:
-                return pickle.load(f)
-        except Exception as e:
-            print(f"Failed to load checkpoint {STATE_PATH}: {e}")
-    return None
+    """Load the last snapshot and replay the journal written after it."""
+    try:
+        state, events = journal.load()
+    except Exception as e:
+        print(f"Failed to load checkpoint {STATE_PATH}: {e}")
+        return None
+    if state is None:
+        return None
+    if "ids" not in state:
+        state = _compact_legacy_state(state)
+    for event in events:
+        _apply_event(state, event)
+    if events:
+        print(f"Replayed {len(events)} journal entries from {JOURNAL_PATH}")
+    return state
+
 
+def choose_id_index(n_seeds, rounds):
+    """Index kind for ID_INDEX = "auto", from a rough estimate of the crawl size."""
+    estimate = n_seeds * ESTIMATED_NEW_PER_PAPER ** min(rounds, 8)
+    return "sqlite" if estimate >= AUTO_INDEX_THRESHOLD else "dict"
 
-def append_records(record_ids, paper_sources, all_backward, all_forward):
-    """Append records for given ids to the temp CSV."""
+
+def rank_round(ids, round_no, candidates, expand):
+    """Score this round's new papers, append them to RANKING_FILE and return
+    the ones to expand next (in discovery order)."""
+    flags = np.frombuffer(bytes(ids.flags), dtype=np.uint8)
+    # seeds (and ids excluded up front) are processed but were never discovered
+    seeds = np.flatnonzero((flags & PROCESSED != 0) & (flags & (BACKWARD | FORWARD) == 0))
+    citing, cited = read_edges(EDGES_PATH, len(ids))
+    signals, score = score_candidates(
+        citing, cited, len(ids), seeds, candidates, RANKING_WEIGHTS
+    )
+    keep = select(score, FRONTIER_TOP_K, FRONTIER_MIN_SCORE) if expand else np.zeros(len(score), bool)
+
+    ranking = pd.DataFrame({"PaperId": ids.decode_many(candidates), "Round": round_no, "Score": score})
+    for name in SIGNALS:
+        ranking[name.capitalize()] = signals[name]
+    ranking["Expanded"] = keep
+    if os.path.exists(RANKING_FILE):
+        previous = pd.read_parquet(RANKING_FILE)
+        ranking = pd.concat([previous[previous["Round"] != round_no], ranking], ignore_index=True)
+    ranking.to_parquet(RANKING_FILE, index=False)
+
+    if expand and not keep.all():
+        print(f"  Ranking kept {int(keep.sum())}/{len(keep)} papers for round {round_no + 1}")
+    return array("l", (idx for idx, k in zip(candidates, keep) if k))
+
+
+def append_records(
+    record_ids, ids, sources, round_no=1, part="part", prefetcher=None, delta_tag=None
+):
+    """Write records for the given interned ids as the Parquet part `part`.
+
+    Metadata comes from `prefetcher` (a MetadataPrefetcher) when given,
+    otherwise it is fetched synchronously. With `delta_tag`, only ids that
+    no earlier delta run emitted are written, tagged with it.
+    """
     if not record_ids:
         return
 
-    meta = fetch_metadata(record_ids)
+    pids = ids.decode_many(record_ids)
+    if delta_tag is not None:
+        new = set(delta.new_ids(pids, delta_tag))
+        record_ids = [idx for idx, pid in zip(record_ids, pids) if pid in new]
+        pids = [pid for pid in pids if pid in new]
+        if not record_ids:
+            return
+    if prefetcher is not None:
+        fetched = prefetcher.take(record_ids)
+        meta = {pid: fetched[idx] for idx, pid in zip(record_ids, pids)}
+    else:
+        meta = fetch_metadata(pids)
 
     records = []
-    for pid in record_ids:
-        sources = paper_sources.get(pid, [])
-        is_backward = 1 if pid in all_backward else 0
-        is_forward = 1 if pid in all_forward else 0
+    for idx, pid in zip(record_ids, pids):
+        paper_sources = sources.get(idx)
+        flags = ids.flags[idx]
+        is_backward = 1 if flags & BACKWARD else 0
+        is_forward = 1 if flags & FORWARD else 0
 
-        source_papers = list(set([s[0] for s in sources]))[:5]
+        source_papers = ids.decode_many(list(dict.fromkeys(s[0] for s in paper_sources))[:5])
         source_types = []
         if is_backward:
             source_types.append("Backward")
@@ -195,129 +817,392 @@ def append_records(record_ids, paper_sources, all_backward, all_forward):
                 "Direction": " + ".join(source_types),
                 "IsBackward": is_backward,
                 "IsForward": is_forward,
-                "SourceCount": len(sources),
+                "SourceCount": len(paper_sources),
                 "SourcePapers": "; ".join(source_papers),
+                "Round": round_no,
             }
         )
+        if delta_tag is not None:
+            records[-1]["Delta"] = delta_tag
+
+    if delta_tag is None:
+        write_part(records, PARTS_DIR, part)
+    else:
+        write_part(records, PARTS_DIR, part, DELTA_SCHEMA)
+        delta.mark_seen(pids, delta_tag)
+
 
-    out_df = pd.DataFrame(records)
-    header = not os.path.exists(CSV_TEMP_PATH)
-    out_df.to_csv(CSV_TEMP_PATH, mode="a", index=False, header=header)
+def finalize_output(excel_file=EXCEL_OUTPUT_FILE, schema=OUTPUT_SCHEMA):
+    """Stream the part files into OUTPUT_FILE (and optionally `excel_file`)."""
+    rows = merge_parts(PARTS_DIR, OUTPUT_FILE, schema)
+    print(f"  [Saved] {OUTPUT_FILE} ({rows} rows)")
+    if excel_file:
+        export_excel(OUTPUT_FILE, excel_file)
+        print(f"  [Saved] {excel_file}")
+    remove_parts(PARTS_DIR)
 
 
-def run_snowballing(paper_ids, processed_ids, resume_state=None):
+def run_snowballing(
+    paper_ids,
+    processed_ids,
+    resume_state=None,
+    rounds=1,
+    excel_file=EXCEL_OUTPUT_FILE,
+    id_index="dict",
+    delta_tag=None,
+):
     """
-    paper_ids: ids to snowball
+    paper_ids: ids to snowball (the round-1 frontier)
     processed_ids: ids already processed (to exclude)
     resume_state: checkpoint dict if resuming
+    rounds: number of breadth-first rounds; round N+1 only fetches the papers
+        first discovered in round N
+    excel_file: optional Excel copy of OUTPUT_FILE (None to skip)
+    id_index: membership index kind for a fresh run (see idindex.py); a
+        resumed run keeps the one stored in its checkpoint
+    delta_tag: run tag of an incremental run (needs the module's `delta`
+        store); only papers no earlier delta run emitted are written
+
+    The working set is kept interned (see idstore.py): ids are dense ints,
+    per-id state is a flag byte and sources are array-backed lists. Ids are
+    decoded to strings only for output and the checkpoint journal.
     """
     if resume_state:
         pending_ids = resume_state["pending_ids"]
         total_papers = resume_state["total_papers"]
-        all_backward = resume_state["all_backward"]
-        all_forward = resume_state["all_forward"]
+        ids = resume_state["ids"]
+        sources = resume_state["sources"]
         round_new_ids = resume_state["round_new_ids"]
-        paper_sources = resume_state["paper_sources"]
         processed_in_round = resume_state["processed_in_round"]
         buffer_new_ids = resume_state["buffer_new_ids"]
+        round_no = resume_state.get("round", 1)
+        edges_end = resume_state.get("edges_end", 0)
+        round_counts.clear()
+        round_counts.update(resume_state.get("round_counts", {}))
     else:
-        pending_ids = list(paper_ids)[::-1]  # stack
+        ids = IdTable(make_index(index_spec(id_index, ID_INDEX_PATH)))
+        sources = SourceLists()
+        for pid in processed_ids:
+            ids.flags[ids.intern(pid)] |= PROCESSED
+        pending_ids = array("l", (ids.intern(pid) for pid in reversed(list(paper_ids))))  # stack
         total_papers = len(pending_ids)
-        all_backward = set()
-        all_forward = set()
-        round_new_ids = set()
-        paper_sources = {}
+        round_new_ids = array("l")  # discovered this round, in discovery order
         processed_in_round = 0
-        buffer_new_ids = []
+        buffer_new_ids = array("l")
+        round_no = 1
+        edges_end = 0
 
-    print(f"  Processing {total_papers} papers...")
-    print(f"  Already processed papers (to exclude): {len(processed_ids)}")
+    # Every returned edge is logged (not just first sources); a resume cuts the
+    # log back to the length recorded with the last journaled paper.
+    edge_log = None
+    if GRAPH_DIR:
+        edge_log = EdgeLog(EDGES_PATH, edges_end if resume_state else None)
 
-    while pending_ids:
-        pid = pending_ids.pop()
-        processed_in_round += 1
-        print(f"  [{processed_in_round}/{total_papers}] Fetching: {pid}")
-        backward, forward = get_neighbors(pid)
-
-        # Dedup + exclude already processed right away
-        for b_pid in backward:
-            if b_pid in processed_ids or b_pid in round_new_ids:
-                continue
-            paper_sources.setdefault(b_pid, []).append((pid, "backward"))
-            round_new_ids.add(b_pid)
-            all_backward.add(b_pid)
-            buffer_new_ids.append(b_pid)
-
-        for f_pid in forward:
-            if f_pid in processed_ids or f_pid in round_new_ids:
-                continue
-            paper_sources.setdefault(f_pid, []).append((pid, "forward"))
-            round_new_ids.add(f_pid)
-            all_forward.add(f_pid)
-            buffer_new_ids.append(f_pid)
-
-        print(
-            f"    -> Backward: {len(backward)}, Forward: {len(forward)}, new_total: {len(round_new_ids)}"
+    def checkpoint(pending):
+        save_state(
+            {
+                "pending_ids": pending,
+                "total_papers": total_papers,
+                "ids": ids,
+                "sources": sources,
+                "round_new_ids": round_new_ids,
+                "processed_in_round": processed_in_round,
+                "buffer_new_ids": buffer_new_ids,
+                "round": round_no,
+                "rounds": rounds,
+                "edges_end": edges_end,
+                "delta_tag": delta_tag,
+                "round_counts": dict(round_counts),
+            }
         )
-        time.sleep(1)
 
-        # Flush every SAVE_EVERY or when finished
-        if processed_in_round % SAVE_EVERY == 0 or not pending_ids:
+    def flush():
+        # Parts are named after the flush position, so a flush repeated after a
+        # crash (part written, journal entry lost) overwrites the same file.
+        nonlocal buffer_new_ids
+        with metrics.timer("flush"):
             append_records(
-                buffer_new_ids, paper_sources, all_backward, all_forward
-            )
-            buffer_new_ids = []
-            save_state(
-                {
-                    "pending_ids": pending_ids,
-                    "total_papers": total_papers,
-                    "all_backward": all_backward,
-                    "all_forward": all_forward,
-                    "round_new_ids": round_new_ids,
-                    "paper_sources": paper_sources,
-                    "processed_in_round": processed_in_round,
-                    "buffer_new_ids": buffer_new_ids,
-                    "processed_ids": processed_ids,
-                }
+                buffer_new_ids,
+                ids,
+                sources,
+                round_no,
+                f"r{round_no:03d}-{processed_in_round:09d}",
+                prefetcher,
+                delta_tag,
             )
+        buffer_new_ids = array("l")
+        journal.append({"e": "flush"})
 
-    combined = list(round_new_ids)
+    metrics.start(METRICS_PATH, METRICS_PORT, METRICS_INTERVAL)
 
-    # Ensure any remaining buffer was written (should be empty)
-    if buffer_new_ids:
-        append_records(buffer_new_ids, paper_sources, all_backward, all_forward)
+    # Titles/DOIs of new ids are fetched in the background while crawling.
+    prefetcher = MetadataPrefetcher(fetch_metadata, ids.decode_many, METADATA_BATCH_SIZE)
 
-    # Finalize CSV -> Excel
-    if os.path.exists(CSV_TEMP_PATH):
-        pd.read_csv(CSV_TEMP_PATH).to_excel(OUTPUT_FILE, index=False)
-        os.remove(CSV_TEMP_PATH)
-        print(f"  [Saved] {OUTPUT_FILE}")
+    tracker = None  # a round resumed mid-way has no estimate to compare with
+    if not resume_state:
+        frontier, tracker = plan_round(ids, pending_ids[::-1], round_no)
+        pending_ids = frontier[::-1]
+        checkpoint(pending_ids)  # base snapshot the journal is replayed onto
     else:
-        pd.DataFrame(
-            columns=[
-                "PaperId",
-                "Title",
-                "DOI",
-                "Direction",
-                "IsBackward",
-                "IsForward",
-                "SourceCount",
-                "SourcePapers",
-            ]
-        ).to_excel(OUTPUT_FILE, index=False)
-        print(f"  [Saved empty] {OUTPUT_FILE}")
+        if delta_tag is not None:
+            # checkpoints from before round_counts was saved, or papers whose
+            # counts could not be fetched: ask again, so delta.record() keeps them
+            missing = [pid for pid in ids.decode_many(pending_ids) if pid not in round_counts]
+            if missing:
+                round_counts.update(fetch_counts(missing))
+        if buffer_new_ids:
+            flush()
+
+    while True:
+        print(f"  Round {round_no}/{rounds}: processing {total_papers} papers...")
+        print(f"  Already processed papers (to exclude): {ids.count_flag(PROCESSED)}")
+
+        # Neighbors are fetched by a thread pool (throttled by the shared limiter),
+        # but results are consumed in submission order so dedup, sources and
+        # checkpoints match a serial run exactly.
+        # In batch mode one future serves a whole batch of papers.
+        batch_size = NEIGHBOR_BATCH_SIZE if BATCH_NEIGHBORS else 1
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            while pending_ids or in_flight:
+                while pending_ids and len(in_flight) < MAX_WORKERS * 2 * batch_size:
+                    batch = [pending_ids.pop() for _ in range(min(batch_size, len(pending_ids)))]
+                    if BATCH_NEIGHBORS:
+                        future = pool.submit(get_neighbors_batch, ids.decode_many(batch))
+                        in_flight.extend((idx, future) for idx in batch)
+                    else:
+                        future = pool.submit(get_neighbors, ids.decode(batch[0]))
+                        in_flight.append((batch[0], future))
+
+                src, future = in_flight.popleft()
+                pid = ids.decode(src)
+                result = future.result()
+                backward, forward = result[pid] if BATCH_NEIGHBORS else result
+                processed_in_round += 1
+                metrics.progress(processed_in_round, total_papers)
+                print(f"  [{processed_in_round}/{total_papers}] Fetched: {pid}")
+
+                # Dedup + exclude already processed right away
+                buffered = len(buffer_new_ids)
+                new_backward = _add_neighbors(
+                    ids, sources, src, backward, BACKWARD, buffer_new_ids, round_new_ids
+                )
+                new_forward = _add_neighbors(
+                    ids, sources, src, forward, FORWARD, buffer_new_ids, round_new_ids
+                )
+                new_ids = buffer_new_ids[buffered:]
+                if delta_tag is not None:
+                    # metadata is only needed for papers that will be written
+                    new = set(delta.new_ids(new_backward + new_forward, delta_tag))
+                    new_ids = [i for i, p in zip(new_ids, new_backward + new_forward) if p in new]
+                    delta.record(pid, round_counts.get(pid), backward, forward)
+                prefetcher.submit(new_ids)
+                if edge_log is not None:
+                    edges_end = edge_log.append_paper(
+                        src, [ids.get(p) for p in backward], [ids.get(p) for p in forward]
+                    )
+
+                # Journal only this paper's new ids; replaying these entries
+                # onto the last snapshot reproduces the state above.
+                with metrics.timer("journal_append"):
+                    journal.append(
+                        {
+                            "e": "paper",
+                            "pid": pid,
+                            "backward": new_backward,
+                            "forward": new_forward,
+                            "edges": edges_end,
+                        }
+                    )
+
+                print(
+                    f"    -> Backward: {len(backward)}, Forward: {len(forward)}, new_total: {len(round_new_ids)}"
+                )
+                if tracker is not None:
+                    tracker.record(src, len(backward) + len(forward))
+
+                # Flush every SAVE_EVERY or when finished
+                if processed_in_round % SAVE_EVERY == 0 or not (pending_ids or in_flight):
+                    flush()
+                    rate, eta = metrics.rate_and_eta()
+                    if eta is not None:
+                        print(f"  {rate:.2f} papers/s, round {round_no} ETA {eta / 60:.1f} min")
+                    if tracker is not None:
+                        print(tracker.report(metrics.calls(*NEIGHBOR_OPS)))
+
+                if journal.events_since_snapshot >= COMPACT_EVERY:
+                    # Papers still in flight are not done yet: put them back on the
+                    # stack (oldest on top) so a resume fetches them again.
+                    checkpoint(pending_ids + array("l", (i for i, _ in reversed(in_flight))))
+
+        # Ensure any remaining buffer was written (should be empty)
+        if buffer_new_ids:
+            flush()
+
+        # The papers first seen in this round form the next frontier; everything
+        # seen so far is excluded from later rounds.
+        flags = ids.flags
+        for idx in round_new_ids:
+            flags[idx] = (flags[idx] & ~IN_ROUND) | PROCESSED
+        print(f"  Round {round_no} done: {len(round_new_ids)} new papers")
+        frontier = round_new_ids
+        if edge_log is not None and RANKING_FILE and round_new_ids:
+            with metrics.timer("rank_round"):
+                frontier = rank_round(ids, round_no, round_new_ids, expand=round_no < rounds)
+        if round_no >= rounds or not frontier:
+            break
+
+        round_no += 1
+        frontier, tracker = plan_round(ids, frontier, round_no)
+        pending_ids = frontier[::-1]
+        total_papers = len(pending_ids)
+        round_new_ids = array("l")
+        processed_in_round = 0
+        checkpoint(pending_ids)
+
+    prefetcher.close()
+    with metrics.timer("finalize_output"):
+        finalize_output(excel_file, OUTPUT_SCHEMA if delta_tag is None else DELTA_SCHEMA)
+    if edge_log is not None:
+        edge_log.close()
+        with metrics.timer("build_graph"):
+            nodes, edges = build_graph(EDGES_PATH, ids.decode_many(range(len(ids))), GRAPH_DIR)
+        print(f"  [Saved] {GRAPH_DIR}/ ({nodes} papers, {edges} citation edges)")
+        edge_log.remove()
+
+    metrics.stop()
+    print("  Time per operation:")
+    print(metrics.summary())
+    if METRICS_PATH:
+        print(f"  [Saved] {METRICS_PATH}")
 
     # Clear state checkpoint
-    if os.path.exists(STATE_PATH):
-        os.remove(STATE_PATH)
+    journal.clear()
+    ids.close()
+    remove_index_files(ids.index_spec)
 
-    return combined, len(all_backward), len(all_forward)
+    discovered = ids.with_flag(BACKWARD | FORWARD)
+    if delta_tag is None:
+        return (
+            ids.decode_many(discovered),
+            ids.count_flag(BACKWARD),
+            ids.count_flag(FORWARD),
+        )
+    pids = ids.decode_many(discovered)
+    new = set(delta.new_ids(pids, delta_tag))
+    new_flags = [ids.flags[idx] for idx, pid in zip(discovered, pids) if pid in new]
+    return (
+        [pid for pid in pids if pid in new],
+        sum(1 for flags in new_flags if flags & BACKWARD),
+        sum(1 for flags in new_flags if flags & FORWARD),
+    )
 
 
 def main():
-    # Load seed paper ids and drop empties (including empty strings / 'nan')
+    global METRICS_PORT, FRONTIER_TOP_K, FRONTIER_MIN_SCORE, SCHEDULE
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=1,
+        help="number of breadth-first snowballing rounds (default: 1)",
+    )
+    parser.add_argument(
+        "--no-excel",
+        action="store_true",
+        help=f"only write {OUTPUT_FILE}, skip the Excel copy",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=0,
+        help="crawl with N worker processes sharing a SQLite work queue (see sharded.py)",
+    )
+    parser.add_argument(
+        "--api-keys-file",
+        help="with --shards: file with one Semantic Scholar API key per line, used round-robin",
+    )
+    parser.add_argument(
+        "--shard-rps",
+        type=float,
+        help="with --shards: requests per second per shard (default: split REQUESTS_PER_SECOND "
+        "between shards sharing a key)",
+    )
+    parser.add_argument(
+        "--dataset",
+        default=DATASET_DIR,
+        help="read neighbors and metadata from a local Semantic Scholar dataset dump "
+        "(directory with papers/ and citations/) instead of the API",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help=f"incremental run: refetch only papers whose counts changed since the last "
+        f"--delta run and write only newly found papers (state in {DELTA_PATH})",
+    )
+    parser.add_argument(
+        "--schedule",
+        choices=POLICIES,
+        default=SCHEDULE,
+        help="order of the papers in each round: input order, cheapest (fewest estimated "
+        "requests) first or highest yield first (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--id-index",
+        choices=("auto",) + INDEX_KINDS,
+        default=ID_INDEX,
+        help="where to keep the id membership index (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        default=FRONTIER_TOP_K,
+        help="expand only the K best-ranked new papers in each following round",
+    )
+    parser.add_argument(
+        "--min-score",
+        type=float,
+        default=FRONTIER_MIN_SCORE,
+        help="expand only new papers whose ranking score (0-1) reaches this value",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_PORT,
+        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics during the run",
+    )
+    args = parser.parse_args()
+    if args.dataset and args.shards:
+        parser.error("--dataset reads a local dump; it cannot be combined with --shards")
+    if args.delta and args.shards:
+        parser.error("--delta cannot be combined with --shards")
+    METRICS_PORT = args.metrics_port
+    FRONTIER_TOP_K = args.top_k
+    FRONTIER_MIN_SCORE = args.min_score
+    SCHEDULE = args.schedule
+
+    api_keys = []
+    if args.api_keys_file:
+        with open(args.api_keys_file, encoding="utf-8") as f:
+            api_keys = [line.strip() for line in f if line.strip()]
+
     print(f"Loading input file: {INPUT_FILE}")
-    df = pd.read_excel(INPUT_FILE)
+    snowball(
+        read_seed_ids(INPUT_FILE),
+        rounds=args.rounds,
+        excel_file=None if args.no_excel else EXCEL_OUTPUT_FILE,
+        id_index=args.id_index,
+        shards=args.shards,
+        api_keys=api_keys,
+        shard_rps=args.shard_rps,
+        dataset_dir=args.dataset,
+        incremental=args.delta,
+    )
+
+
+def read_seed_ids(path):
+    """Unique non-empty PaperIds of the Excel file `path`, in input order."""
+    df = pd.read_excel(path)
     seed_ids = (
         df["PaperId"]
         .dropna()
@@ -325,38 +1210,105 @@ def main():
         .str.strip()
     )
     seed_ids = [pid for pid in seed_ids if pid and pid.lower() != "nan"]
-    seed_ids = list(dict.fromkeys(seed_ids))  # keep order while dedup
-    
-    state = load_state()
+    return list(dict.fromkeys(seed_ids))  # keep order while dedup
+
+
+def snowball(
+    seed_ids,
+    rounds=1,
+    excel_file=EXCEL_OUTPUT_FILE,
+    id_index=ID_INDEX,
+    shards=0,
+    api_keys=(),
+    shard_rps=None,
+    dataset_dir=None,
+    incremental=False,
+    source=INPUT_FILE,
+):
+    """Snowball from `seed_ids`, resuming a checkpoint if there is one, and
+    write OUTPUT_FILE and its stats file; `source` only labels the seeds.
+
+    Returns (new paper ids, backward count, forward count), or None if
+    OUTPUT_FILE already exists and there is nothing to resume.
+    """
+    global OUTPUT_FILE, dataset, delta
+    seed_ids = list(dict.fromkeys(seed_ids))
+
+    if shards:
+        from sharded import SHARD_DB
+
+        state = os.path.exists(SHARD_DB)
+    else:
+        state = load_state()
+
+    delta_tag = None
+    if incremental:
+        delta = DeltaStore(DELTA_PATH)
+        delta_tag = (state or {}).get("delta_tag") or time.strftime("%Y%m%d-%H%M%S")
+        base = os.path.splitext(OUTPUT_FILE)[0]
+        OUTPUT_FILE = f"{base}_delta_{delta_tag}.parquet"
+        if excel_file:
+            excel_file = f"{base}_delta_{delta_tag}.xlsx"
 
     # Check if output already exists
     if os.path.exists(OUTPUT_FILE) and not state:
         print(f"Output file {OUTPUT_FILE} already exists. Delete it to re-run.")
-        return
+        return None
 
-    # Determine starting point
-    if state:
-        all_processed = set(state.get("processed_ids", seed_ids))
+    # Determine starting point (a checkpoint carries its own processed set)
+    all_processed = set(seed_ids)
+    if state and not shards:
         print(f"Resuming from checkpoint: pending {len(state['pending_ids'])} papers")
-    else:
-        all_processed = set(seed_ids)
 
     print("\n" + "=" * 60)
-    print("Snowballing (1 round)...")
+    print(f"Snowballing ({rounds} round{'s' if rounds != 1 else ''})...")
     print(f"Seed papers: {len(seed_ids)}")
-    print(f"Input file: {INPUT_FILE}")
-    print(f"Output file: {OUTPUT_FILE}")
+    if id_index == "auto":
+        id_index = choose_id_index(len(seed_ids), rounds)
+    if shards:
+        print(f"Shards: {shards}")
+    elif not state:
+        print(f"Id index: {id_index}")
+    if dataset_dir:
+        print(f"Neighbor source: dataset {dataset_dir}")
+    if incremental:
+        print(f"Delta run {delta_tag}: {len(delta)} papers emitted by earlier runs")
+    print(f"Input: {source}")
+    print(f"Output file: {OUTPUT_FILE}" + (f" (+ {excel_file})" if excel_file else ""))
     print("=" * 60)
 
-    new_ids, b_count, f_count = run_snowballing(
-        seed_ids, all_processed, state
-    )
+    if dataset_dir:
+        dataset = LocalDataset.open(dataset_dir, DATASET_INDEX_DIR)
+
+    if shards:
+        from sharded import run_sharded
+
+        new_ids, b_count, f_count = run_sharded(
+            seed_ids,
+            all_processed,
+            shards,
+            rounds=rounds,
+            excel_file=excel_file,
+            api_keys=list(api_keys),
+            shard_rps=shard_rps,
+        )
+    else:
+        new_ids, b_count, f_count = run_snowballing(
+            seed_ids,
+            all_processed,
+            state,
+            rounds=rounds,
+            excel_file=excel_file,
+            id_index=id_index,
+            delta_tag=delta_tag,
+        )
     all_processed.update(new_ids)
 
     # Write stats
-    stats_file = OUTPUT_FILE.replace(".xlsx", "_stats.txt")
+    stats_file = os.path.splitext(OUTPUT_FILE)[0] + "_stats.txt"
     with open(stats_file, "w", encoding="utf-8") as f:
         f.write(f"Initial seed papers: {len(seed_ids)}\n")
+        f.write(f"Rounds: {rounds}\n")
         f.write(f"Backward papers found: {b_count}\n")
         f.write(f"Forward papers found: {f_count}\n")
         f.write(f"Total new papers: {len(new_ids)}\n")
@@ -366,16 +1318,19 @@ def main():
     print("Snowballing complete!")
     print("=" * 60)
     print(f"Initial seed papers: {len(seed_ids)}")
+    print(f"Rounds: {rounds}")
     print(f"Backward papers found: {b_count}")
     print(f"Forward papers found: {f_count}")
     print(f"Total new papers: {len(new_ids)}")
     print(f"Total unique papers (including seeds): {len(all_processed)}")
     print(f"Output saved to: {OUTPUT_FILE}")
+    if excel_file:
+        print(f"Excel copy saved to: {excel_file}")
     print(f"Stats saved to: {stats_file}")
     print("=" * 60)
 
-    if os.path.exists(STATE_PATH):
-        os.remove(STATE_PATH)
+    journal.clear()
+    return new_ids, b_count, f_count
 
 
 if __name__ == "__main__":
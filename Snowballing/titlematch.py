@@ -0,0 +1,43 @@
+"""
+Local fuzzy title matching for getDoi.py.
+
+Titles are normalized (accents, case, punctuation and spacing removed)
+and compared by the Dice coefficient of their character trigrams, which
+tolerates typos, subtitles cut differently and word-order noise while
+being cheap to compute. It is only used to re-rank search candidates;
+manual overrides match exact normalized titles.
+"""
+
+import re
+import unicodedata
+
+YEAR_TOLERANCE = 1  # years apart still treated as the same paper (preprints)
+YEAR_PENALTY = 0.85  # confidence factor when the years disagree by more
+
+
+def normalize(title):
+    """Lowercase ASCII words of `title` separated by single spaces."""
+    text = unicodedata.normalize("NFKD", title or "")
+    text = text.encode("ascii", "ignore").decode().lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def trigrams(title):
+    padded = f"  {normalize(title)} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Dice coefficient of the trigram sets of two titles (0..1)."""
+    ga, gb = trigrams(a), trigrams(b)
+    if not ga or not gb:
+        return 0.0
+    return 2 * len(ga & gb) / (len(ga) + len(gb))
+
+
+def confidence(query_title, query_year, title, year):
+    """Match confidence: title similarity, lowered if the years disagree."""
+    score = similarity(query_title, title)
+    if query_year is not None and year is not None and abs(int(query_year) - int(year)) > YEAR_TOLERANCE:
+        score *= YEAR_PENALTY
+    return score